@@ -0,0 +1,81 @@
+#
+# This module contains AnytimeContext, the per-query state of an anytime repairing A* (ARA*) search over a GridGraph.
+#
+
+from searchcontext import SearchContext
+
+class AnytimeContext(SearchContext):
+    """AnytimeContext
+        The state of an ARA* search (Likhachev, Gordon and Thrun, 2003): a weighted A* search, ordered by
+        g + weight * h, whose weight is lowered step by step while keeping everything already computed.
+
+        A closed cell whose g is lowered is not reopened within the current weight, but is remembered in
+        the inconsistent set, and goes back on the open list when the weight is next lowered. Each pass then
+        only repairs the part of the search affected by the lower weight.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to search
+        from_cell: int
+            the cell id the search starts from
+        heuristic: function
+            returns the heuristic value of a cell id, see heuristics.cell_heuristic
+        weight: float
+            the initial inflation of the heuristic, at least 1
+    """
+    def __init__(self, graph, from_cell, heuristic, weight):
+        self.weight = weight
+        self.inconsistent = set()
+        super().__init__(graph, from_cell, heuristic)
+
+    def f(self, cell):
+        h = self.h.get(cell)
+        if h is None:
+            h = self.h[cell] = self.heuristic(cell)
+        return self.g[cell] + self.weight * h
+
+    def relax(self, cell):
+        """ Lowers the g of every neighbor of *cell* that is shorter to reach through it, opening it, or
+            marking it inconsistent if it is closed. Returns the neighbors whose g was set.
+        """
+        g, parent, open_nodes, closed_nodes = self.g, self.parent, self.open_nodes, self.closed_nodes
+
+        updated = []
+        neighbor_g = g[cell] + 1
+        for offset in self.graph.mask_offsets[self.graph.neighbor_masks[cell]]:
+            neighbor = cell + offset
+
+            existing_g = g.get(neighbor)
+            if existing_g is None or neighbor_g < existing_g:
+                g[neighbor] = neighbor_g
+                parent[neighbor] = cell
+                if neighbor in closed_nodes:
+                    self.inconsistent.add(neighbor)
+                else:
+                    open_nodes.insert(neighbor)
+                updated.append(neighbor)
+
+        return updated
+
+    def lower_bound(self):
+        """ Returns the smallest unweighted g + h of the open and inconsistent cells. As every unfinished
+            path passes through one of them, no path to the goal can be shorter than this.
+        """
+        bounds = [self.g[cell] + self.h.get(cell, 0) for cell in self.open_nodes.queue]
+        bounds.extend(self.g[cell] + self.h[cell] for cell in self.inconsistent)
+        return min(bounds, default=float('inf'))
+
+    def set_weight(self, weight):
+        """ Lowers the weight for the next pass: the open list is reordered by the new f, inconsistent cells
+            are reopened, and the closed set is emptied.
+        """
+        self.peak_closed = max(self.peak_closed, len(self.closed_nodes))
+        self.reopened += len(self.inconsistent)
+
+        self.weight = weight
+        self.closed_nodes = set()
+        self.open_nodes.reprioritize()
+        for cell in self.inconsistent:
+            self.open_nodes.insert(cell)
+        self.inconsistent = set()
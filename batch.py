@@ -0,0 +1,218 @@
+#
+# This module contains the batch query API behind SearchableMaze.find_paths, which runs many searches across a
+# pool of worker processes that share a single copy of the maze's graph.
+#
+
+import os, pickle, time
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from array import array
+from gridgraph import GridGraph
+from landmarks import LANDMARKS, Landmarks
+from searchablemaze import SearchableMaze
+
+# Searches that can be run in a batch. Each needs nothing from the maze but its graph.
+BATCH_METHODS = (
+    "find_path",
+    "find_bidirectional_path",
+    "find_jps_path",
+    "find_contracted_path",
+    "find_hierarchical_path",
+)
+
+class SharedMaze:
+    """SharedMaze
+        Stands in for a Maze inside worker processes, providing SearchableMaze with a graph over shared memory.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+class SharedGraph:
+    """SharedGraph
+        A copy of a GridGraph's passable map, neighbor masks and component labels in one block of shared
+        memory, laid out one after another. Workers attach to it by name instead of being sent the graph.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to share; its components are labelled first if they have not been yet
+    """
+    def __init__(self, graph):
+        self.width = graph.width
+        self.height = graph.height
+
+        size = graph.size
+        components = graph.components
+
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, 6 * size))
+        self.memory.buf[0:size] = graph.passable
+        self.memory.buf[size:2 * size] = graph.neighbor_masks
+        self.memory.buf[2 * size:6 * size] = components.tobytes()
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @staticmethod
+    def attach(name, width, height):
+        """ Attaches to a SharedGraph by name, returning the shared memory and a GridGraph over it. The
+            memory must be kept open for as long as the graph is used.
+        """
+        size = width * height
+        memory = shared_memory.SharedMemory(name=name)
+        graph = GridGraph.from_buffers(
+            width, height,
+            memory.buf[0:size],
+            memory.buf[size:2 * size],
+            memory.buf[2 * size:6 * size].cast('i')
+        )
+        return (memory, graph)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+class SharedLandmarks:
+    """SharedLandmarks
+        A copy of the landmark cells and distance arrays of a Landmarks in one block of shared memory, so
+        that workers use the caller's landmarks rather than placing their own with the default settings.
+
+        Parameters
+        __________
+        landmarks: Landmarks
+            the landmarks to share
+    """
+    def __init__(self, landmarks):
+        self.count = len(landmarks.cells)
+
+        size = landmarks.graph.size
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, 4 * self.count * (1 + size)))
+        self.memory.buf[0:4 * self.count] = array('i', landmarks.cells).tobytes()
+        for index, distances in enumerate(landmarks.distances):
+            offset = 4 * (self.count + index * size)
+            self.memory.buf[offset:offset + 4 * size] = array('i', distances).tobytes()
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @staticmethod
+    def attach(name, graph, count):
+        """ Attaches to a SharedLandmarks by name, returning the shared memory and Landmarks over it. The
+            memory must be kept open for as long as the landmarks are used.
+        """
+        size = graph.size
+        memory = shared_memory.SharedMemory(name=name)
+        values = memory.buf[0:4 * count * (1 + size)].cast('i')
+        distances = [values[count + index * size:count + (index + 1) * size] for index in range(0, count)]
+        return (memory, Landmarks.from_arrays(graph, values[0:count], distances))
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+# The shared memory and SearchableMaze of a worker process, set up once by initialize_worker
+_worker_memory = []
+_worker_maze = None
+
+def initialize_worker(name, width, height, heuristic, landmarks_name=None, landmark_count=0):
+    global _worker_maze
+    memory, graph = SharedGraph.attach(name, width, height)
+    _worker_memory.append(memory)
+    _worker_maze = SearchableMaze(SharedMaze(graph), heuristic)
+
+    if landmarks_name is not None:
+        memory, _worker_maze.landmarks = SharedLandmarks.attach(landmarks_name, graph, landmark_count)
+        _worker_memory.append(memory)
+
+def run_chunk(chunk, method, heuristic):
+    return [run_query(_worker_maze, index, a, b, method, heuristic) for index, a, b in chunk]
+
+def run_query(searchable, index, from_point, to_point, method, heuristic=None):
+    """ Runs one search, returning its result as a dict in the form of find_bidirectional_path's, with the
+        query's *index* in the batch and its endpoints added as "index", "from" and "to".
+    """
+    timing_start = time.perf_counter()
+    result = getattr(searchable, method)(from_point, to_point, heuristic)
+    duration = time.perf_counter() - timing_start
+
+    if isinstance(result, tuple):
+        path, iterations = result
+        result = {
+            "paths": [path] if path is not None else [],
+            "found": path is not None,
+            "iterations": iterations,
+            "duration": duration,
+            "stats": result.stats
+        }
+
+    result["index"] = index
+    result["from"] = from_point
+    result["to"] = to_point
+    return result
+
+def find_paths(searchable, queries, method="find_path", heuristic=None, processes=None, chunk_size=64):
+    """ Runs *method* for every (from_point, to_point) pair in *queries*, returning a generator that yields
+        the results as they finish, which is not necessarily in the order of *queries*. The arguments are
+        checked before anything runs, so a batch that cannot be run raises ValueError here rather than
+        inside the pool. See SearchableMaze.find_paths.
+    """
+    if method not in BATCH_METHODS:
+        raise ValueError(f"Unknown batch search method {method!r}, expected one of {list(BATCH_METHODS)}.")
+
+    queries = ((index, tuple(a), tuple(b)) for index, (a, b) in enumerate(queries))
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1:
+        return (run_query(searchable, index, a, b, method, heuristic) for index, a, b in queries)
+
+    if not searchable.graph.has_components:
+        raise ValueError(
+            f"{type(searchable.graph).__name__} cannot be shared with worker processes, as it has no component "
+            "labels; run the batch with processes=1."
+        )
+
+    # Heuristics are sent to the workers, so callables must be importable functions, not lambdas or closures
+    for value in (searchable.heuristic, heuristic):
+        if callable(value):
+            try:
+                pickle.dumps(value)
+            except (pickle.PicklingError, AttributeError, TypeError) as error:
+                raise ValueError(
+                    f"The heuristic {value!r} cannot be sent to worker processes ({error}); use a function "
+                    "defined at module level, or run the batch with processes=1."
+                ) from error
+
+    return run_pool(searchable, queries, method, heuristic, processes, chunk_size)
+
+def run_pool(searchable, queries, method, heuristic, processes, chunk_size):
+    """ Runs the numbered *queries* across a pool of *processes* workers sharing the graph, yielding the
+        results as their chunks finish.
+    """
+    shared = SharedGraph(searchable.graph)
+    shared_landmarks = None
+    try:
+        initargs = (shared.name, shared.width, shared.height, searchable.heuristic)
+        if (heuristic if heuristic is not None else searchable.heuristic) == LANDMARKS:
+            shared_landmarks = SharedLandmarks(searchable.landmarks)
+            initargs += (shared_landmarks.name, shared_landmarks.count)
+
+        with ProcessPoolExecutor(processes, initializer=initialize_worker, initargs=initargs) as pool:
+            futures = []
+            chunk = list(islice(queries, chunk_size))
+            while chunk:
+                futures.append(pool.submit(run_chunk, chunk, method, heuristic))
+                chunk = list(islice(queries, chunk_size))
+
+            # If the caller stops early, queries that have not started yet are dropped
+            try:
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        shared.close()
+        if shared_landmarks is not None:
+            shared_landmarks.close()
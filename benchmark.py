@@ -0,0 +1,293 @@
+#
+# This module contains the command line benchmark suite for the searches of SearchableMaze. It runs every search
+# over seeded mazes of several sizes, writes the measurements as JSON, and compares them against a saved baseline.
+#
+#   python benchmark.py --sizes 64 256 1024 --output results.json
+#   python benchmark.py --sizes 64 256 1024 --baseline results.json
+#   python benchmark.py --sizes 1024 --methods find_path --processes 1 2 4
+#
+# With --processes, the batch throughput of SearchableMaze.find_paths is also measured for each process count.
+#
+
+import argparse, gc, json, platform, random, statistics, sys, time, tracemalloc
+from batch import BATCH_METHODS
+from maze import Maze
+from searchablemaze import SearchableMaze
+
+METHODS = ("find_path", "find_novel_path", "find_bidirectional_path")
+
+# Methods that always return a shortest path. find_novel_path returns the shortest path through a midpoint, so
+# its optimality ratio is expected to exceed 1 and is reported without being counted as a regression.
+EXACT_METHODS = ("find_path", "find_bidirectional_path")
+
+# Metrics only counted as regressions for EXACT_METHODS
+EXACT_METRICS = ("mean_optimality_ratio",)
+
+# Metrics compared against a baseline, and whether a higher value is worse
+COMPARED_METRICS = {
+    "median_ms": True,
+    "p95_ms": True,
+    "mean_expansions": True,
+    "peak_memory_bytes": True,
+    "mean_optimality_ratio": True,
+}
+
+def percentile(values, fraction):
+    """ Returns the *fraction* percentile of *values* by linear interpolation between the nearest ranks. """
+    values = sorted(values)
+    if not values: return None
+
+    rank = (len(values) - 1) * fraction
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def build_corpus(size, algorithm, mazes, queries, seed):
+    """ Generates *mazes* seeded mazes of *size* x *size* cells, each with *queries* (start, goal, distance)
+        triples between random cells of its largest connected component. The first query of every maze
+        runs corner to corner.
+    """
+    corpus = []
+    for index in range(0, mazes):
+        maze_seed = seed * 1000003 + size * 1009 + index
+        maze = Maze()
+        maze.generate((size, size), (0, 0), (size - 1, size - 1), algorithm, seed=maze_seed)
+
+        graph = SearchableMaze(maze).graph
+        rng = random.Random(maze_seed)
+        component = graph.components[0]
+        cells = [cell for cell in range(0, graph.size) if graph.components[cell] == component]
+
+        pairs = [(0, graph.cell_id((size - 1, size - 1)))]
+        while len(pairs) < queries:
+            pairs.append((rng.choice(cells), rng.choice(cells)))
+
+        maze_queries = []
+        for from_cell, to_cell in pairs:
+            distance = graph.distances_from([from_cell])[to_cell]
+            maze_queries.append((tuple(graph.position(from_cell)), tuple(graph.position(to_cell)), distance))
+
+        corpus.append((maze, maze_queries))
+    return corpus
+
+def run_query(searchable, method, from_point, to_point):
+    """ Runs one search, returning (steps in the path found or None, expansions). """
+    result = getattr(searchable, method)(from_point, to_point)
+
+    if isinstance(result, tuple):
+        path, iterations = result
+        return (len(path) - 1 if path is not None else None, iterations)
+
+    if not result["found"]:
+        return (None, result["iterations"])
+
+    # The halves of a novel path both include the midpoint
+    steps = sum(len(path) - 1 for path in result["paths"])
+    return (steps, result["iterations"])
+
+def benchmark_method(corpus, method, heuristic, repeat, warmup):
+    """ Measures *method* over every query of *corpus*, returning a dict of metrics. """
+    searchables = [(SearchableMaze(maze, heuristic), queries) for maze, queries in corpus]
+
+    for _ in range(0, warmup):
+        for searchable, queries in searchables:
+            for from_point, to_point, distance in queries:
+                run_query(searchable, method, from_point, to_point)
+
+    durations = []
+    expansions = []
+    ratios = []
+    found = 0
+    total = 0
+
+    gc.collect()
+    for _ in range(0, repeat):
+        for searchable, queries in searchables:
+            for from_point, to_point, distance in queries:
+                timing_start = time.perf_counter()
+                steps, iterations = run_query(searchable, method, from_point, to_point)
+                durations.append(time.perf_counter() - timing_start)
+
+                expansions.append(iterations)
+                total += 1
+                if steps is not None:
+                    found += 1
+                    ratios.append(steps / distance if distance > 0 else 1.0)
+
+    # Memory is traced in a separate, untimed pass, as tracing slows every allocation down
+    peak_memory = 0
+    for searchable, queries in searchables:
+        for from_point, to_point, distance in queries:
+            tracemalloc.start()
+            run_query(searchable, method, from_point, to_point)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    return {
+        "queries": total,
+        "found_rate": found / total if total else None,
+        "median_ms": statistics.median(durations) * 1000 if durations else None,
+        "p95_ms": percentile(durations, 0.95) * 1000 if durations else None,
+        "mean_expansions": statistics.mean(expansions) if expansions else None,
+        "peak_memory_bytes": peak_memory,
+        "mean_optimality_ratio": statistics.mean(ratios) if ratios else None,
+        "max_optimality_ratio": max(ratios) if ratios else None,
+    }
+
+def benchmark_batch(corpus, method, heuristic, repeat, processes):
+    """ Measures the throughput of running every query of *corpus* *repeat* times as one batch per maze with
+        SearchableMaze.find_paths, for each process count in *processes*. Returns a dict of metrics per count,
+        with the speedup over the first count. The times include starting the pool and sharing the graph.
+    """
+    searchables = [(SearchableMaze(maze, heuristic), queries) for maze, queries in corpus]
+
+    results = []
+    for count in processes:
+        total = 0
+        gc.collect()
+        timing_start = time.perf_counter()
+        for searchable, queries in searchables:
+            pairs = [(from_point, to_point) for from_point, to_point, distance in queries] * repeat
+            total += sum(1 for _ in searchable.find_paths(pairs, method, processes=count))
+        seconds = time.perf_counter() - timing_start
+
+        results.append({
+            "processes": count,
+            "queries": total,
+            "seconds": seconds,
+            "queries_per_second": total / seconds,
+        })
+
+    for result in results:
+        result["speedup"] = result["queries_per_second"] / results[0]["queries_per_second"]
+    return results
+
+def run(args):
+    results = []
+    batch_results = []
+    for size in args.sizes:
+        corpus = build_corpus(size, args.algorithm, args.mazes, args.queries, args.seed)
+        for method in args.methods:
+            metrics = benchmark_method(corpus, method, args.heuristic, args.repeat, args.warmup)
+            metrics.update(size=size, method=method)
+            results.append(metrics)
+            print_result(metrics)
+
+            if args.processes and method in BATCH_METHODS:
+                for batch_metrics in benchmark_batch(corpus, method, args.heuristic, args.repeat, args.processes):
+                    batch_metrics.update(size=size, method=method)
+                    batch_results.append(batch_metrics)
+                    print_batch_result(batch_metrics)
+
+    return {
+        "config": {
+            "sizes": args.sizes,
+            "methods": args.methods,
+            "algorithm": args.algorithm,
+            "heuristic": args.heuristic,
+            "mazes": args.mazes,
+            "queries": args.queries,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "processes": args.processes,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+        "batch_results": batch_results,
+    }
+
+def print_result(metrics):
+    ratio = metrics["mean_optimality_ratio"]
+    print(
+        f"{metrics['size']:>5} {metrics['method']:<24}"
+        f" median {metrics['median_ms']:9.3f} ms  p95 {metrics['p95_ms']:9.3f} ms"
+        f"  expansions {metrics['mean_expansions']:10.1f}"
+        f"  peak {metrics['peak_memory_bytes'] / 1024:9.1f} KiB"
+        f"  optimality {'-' if ratio is None else format(ratio, '.3f')}"
+    )
+
+def print_batch_result(metrics):
+    print(
+        f"{metrics['size']:>5} {metrics['method']:<24}"
+        f" batch of {metrics['queries']} on {metrics['processes']:>2} process(es)"
+        f"  {metrics['queries_per_second']:10.1f} queries/s  speedup {metrics['speedup']:.2f}x"
+    )
+
+def compare(report, baseline, threshold):
+    """ Prints how each metric of *report* changed from *baseline*, and returns the regressions: metrics
+        that got worse by more than *threshold*, as a fraction of the baseline value. EXACT_METRICS of other
+        methods than EXACT_METHODS are printed but never regressions.
+    """
+    if baseline["config"] != report["config"]:
+        print("Warning: the baseline was run with a different configuration, so it may not be comparable.")
+
+    baseline_results = {(result["size"], result["method"]): result for result in baseline["results"]}
+
+    regressions = []
+    print(f"\nChange from baseline (regressions beyond {threshold:.0%} are marked with !):")
+    for result in report["results"]:
+        previous = baseline_results.get((result["size"], result["method"]))
+        if previous is None: continue
+
+        changes = []
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None: continue
+
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if metric in EXACT_METRICS and result["method"] not in EXACT_METHODS:
+                worse = False
+            changes.append(f"{metric} {change:+.1%}{' !' if worse else ''}")
+            if worse:
+                regressions.append((result["size"], result["method"], metric, old, new))
+
+        print(f"{result['size']:>5} {result['method']:<24} " + ", ".join(changes))
+
+    return regressions
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the searches of SearchableMaze over seeded mazes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 128, 256, 512],
+                        help="side lengths of the mazes to run, e.g. 64 256 1024 4096")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--algorithm", default="kruskal", help="maze generation algorithm, see Maze.generate")
+    parser.add_argument("--heuristic", default="manhattan")
+    parser.add_argument("--mazes", type=int, default=3, help="mazes per size")
+    parser.add_argument("--queries", type=int, default=10, help="queries per maze")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every query")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs of every query first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        help="also measure batch throughput with find_paths on each number of processes, e.g. 1 2 4")
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change in a metric counted as a regression (default 0.1)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) found.")
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#
+# This module contains Bitboard, which answers reachability and unit-cost distance queries with the rows of a
+# maze packed into Python integers, so that a whole row of a breadth first search layer is expanded by a few
+# shifts, ORs and ANDs instead of one operation per cell. It has no dependencies beyond the standard library.
+#
+
+# Translation table from GridGraph.passable bytes to the binary digits used to pack a row into an integer.
+DIGIT_TABLE = bytes(ord('1') if byte else ord('0') for byte in range(256))
+
+class Bitboard:
+    """Bitboard
+        Stores the passable cells of a GridGraph as one integer per row, with bit x of row y set if cell
+        (x, y) is passable. Sets of cells, such as the cells within k steps of a position, are returned in
+        the same form: a list of one integer per row.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph whose passability map to pack
+    """
+    def __init__(self, graph):
+        self.width = graph.width
+        self.height = graph.height
+
+        # Digits are reversed so that the leftmost cell ends up in the least significant bit
+        self.rows = [
+            int(bytes(graph.passable[y * self.width:(y + 1) * self.width]).translate(DIGIT_TABLE)[::-1] or b'0', 2)
+            for y in range(0, self.height)
+        ]
+
+    def is_passable(self, pos):
+        return (self.rows[pos[1]] >> pos[0]) & 1 == 1
+
+    def set_passable(self, pos, passable):
+        """ Sets or clears the bit of the (x, y) position *pos*. """
+        if passable:
+            self.rows[pos[1]] |= 1 << pos[0]
+        else:
+            self.rows[pos[1]] &= ~(1 << pos[0])
+
+    def reachable(self, a, b):
+        """ Returns True if a path joins the (x, y) positions *a* and *b*.
+
+            This is a scanline flood fill: every run of passable cells touched in a row is filled at once,
+            then spills into the rows above and below, until *b* is reached or nothing changes.
+        """
+        if not self.is_passable(a) or not self.is_passable(b): return False
+
+        rows, height = self.rows, self.height
+        target_y, target_bit = b[1], 1 << b[0]
+
+        reached = [0] * height
+        reached[a[1]] = self.__fill(1 << a[0], rows[a[1]])
+        pending = [a[1]]
+
+        while pending:
+            y = pending.pop()
+            if reached[target_y] & target_bit: return True
+
+            bits = reached[y]
+            for other in (y - 1, y + 1):
+                if other < 0 or other >= height: continue
+
+                spill = bits & rows[other] & ~reached[other]
+                if spill:
+                    reached[other] |= self.__fill(spill, rows[other])
+                    pending.append(other)
+
+        return bool(reached[target_y] & target_bit)
+
+    def distance(self, a, b):
+        """ Returns the number of steps on a shortest path between the (x, y) positions *a* and *b*, or None if
+            they are not connected.
+
+            Both ends are searched layer by layer, always advancing the smaller frontier, until they touch.
+        """
+        if not self.is_passable(a) or not self.is_passable(b): return None
+        if a[0] == b[0] and a[1] == b[1]: return 0
+
+        searches = []
+        for pos in (a, b):
+            visited = [0] * self.height
+            visited[pos[1]] = 1 << pos[0]
+            searches.append({"visited": visited, "layers": [{pos[1]: 1 << pos[0]}]})
+
+        while True:
+            # The cost of a step grows with the number of rows in the frontier
+            search, other = sorted(searches, key=lambda s: len(s["layers"][-1]))
+            frontier = self.__step(search["layers"][-1], search["visited"])
+            if not frontier: return None
+            search["layers"].append(frontier)
+
+            other_visited = other["visited"]
+            if not any(other_visited[y] & bits for y, bits in frontier.items()): continue
+
+            # The first layer of the other search touched by the new frontier gives the shortest distance.
+            for depth, layer in enumerate(other["layers"]):
+                for y, bits in frontier.items():
+                    if layer.get(y, 0) & bits:
+                        return len(search["layers"]) - 1 + depth
+
+    def within(self, pos, steps):
+        """ Returns the cells at most *steps* steps from the (x, y) position *pos*, as one integer per row. """
+        visited = [0] * self.height
+        if not self.is_passable(pos): return visited
+
+        visited[pos[1]] = 1 << pos[0]
+        frontier = {pos[1]: 1 << pos[0]}
+        for step in range(0, steps):
+            frontier = self.__step(frontier, visited)
+            if not frontier: break
+
+        return visited
+
+    def __step(self, frontier, visited):
+        """ Expands a breadth first search layer, given as {y: row bits}, by one step. Newly reached cells are
+            added to *visited*, and returned as the next layer.
+        """
+        rows, height = self.rows, self.height
+
+        spread = {}
+        for y, bits in frontier.items():
+            spread[y] = spread.get(y, 0) | (bits << 1) | (bits >> 1)
+            if y > 0: spread[y - 1] = spread.get(y - 1, 0) | bits
+            if y < height - 1: spread[y + 1] = spread.get(y + 1, 0) | bits
+
+        layer = {}
+        for y, bits in spread.items():
+            bits &= rows[y] & ~visited[y]
+            if bits:
+                visited[y] |= bits
+                layer[y] = bits
+
+        return layer
+
+    def __fill(self, bits, row):
+        """ Extends *bits*, which must be a subset of *row*, to the whole runs of set bits of *row* containing them. """
+
+        # Upwards, adding bits to the row carries them through the top of their runs
+        filled = (((row + bits) ^ row) & row) | bits
+
+        # Downwards, a Kogge-Stone fill doubles the reach of every run at each step
+        runs = row
+        shift = 1
+        while runs and shift < self.width:
+            filled |= runs & (filled >> shift)
+            runs &= runs >> shift
+            shift <<= 1
+
+        return filled
+
+def positions(rows):
+    """ Yields the (x, y) position of every set bit of a list of row integers, such as one returned by Bitboard.within. """
+    for y, bits in enumerate(rows):
+        while bits:
+            low = bits & -bits
+            yield (low.bit_length() - 1, y)
+            bits ^= low
@@ -0,0 +1,148 @@
+#
+# This module contains DStarLite, an incremental planner that repairs its shortest path when cells of a maze change.
+#
+
+from priorityqueue import PriorityQueue, identity_key
+from heuristics import get_heuristic
+
+INFINITY = float('inf')
+
+class DStarLite:
+    """DStarLite
+        D* Lite (Koenig and Likhachev, 2002) over a GridGraph. The search runs backwards from the goal, so
+        the g value of a cell is its distance to the goal, and rhs is the one-step lookahead of g through
+        the cell's neighbors. A cell whose g and rhs differ is inconsistent and waits on the open list.
+
+        After cells change, cells_changed() recomputes rhs for the changed cells and their neighbors only,
+        and the next plan() re-expands just the cells whose distance to the goal was affected. The start
+        may also move along the path with move_start(), which keeps every value computed so far.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to plan over, edited through GridGraph.set_passable
+        from_point: tuple
+            the (x, y) start
+        to_point: tuple
+            the (x, y) goal
+        heuristic: str or function
+            a consistent heuristic taking two positions, see heuristics.get_heuristic
+    """
+    def __init__(self, graph, from_point, to_point, heuristic="manhattan"):
+        self.graph = graph
+        self.heuristic = get_heuristic(heuristic)
+
+        self.start = graph.cell_id(from_point)
+        self.goal = graph.cell_id(to_point)
+
+        # Heuristic values in the open list are relative to the start at the time they were inserted.
+        # km is the sum of the distances the start has moved since, which keeps old keys valid lower bounds.
+        self.last_start = self.start
+        self.km = 0
+
+        self.g = {}
+        self.rhs = {self.goal: 0}
+
+        self.open_nodes = PriorityQueue(identity_key, self.calculate_key)
+        self.open_nodes.insert(self.goal)
+
+    def h(self, a_cell, b_cell):
+        width = self.graph.width
+        a_y, a_x = divmod(a_cell, width)
+        b_y, b_x = divmod(b_cell, width)
+        return self.heuristic((a_x, a_y), (b_x, b_y))
+
+    def calculate_key(self, cell):
+        best = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return (best + self.h(self.start, cell) + self.km, best)
+
+    def neighbors(self, cell):
+        """ Returns the cells joined to *cell* by an edge: its passable neighbors, or none if it is a wall. """
+        graph = self.graph
+        if not graph.passable[cell]: return ()
+        return [cell + offset for offset in graph.mask_offsets[graph.neighbor_masks[cell]]]
+
+    def update_cell(self, cell):
+        """ Recomputes the rhs of *cell* and puts it on the open list if, and only if, it is inconsistent. """
+        g, rhs = self.g, self.rhs
+
+        if cell != self.goal:
+            rhs[cell] = min((g.get(neighbor, INFINITY) + 1 for neighbor in self.neighbors(cell)), default=INFINITY)
+
+        if cell in self.open_nodes:
+            self.open_nodes.remove(cell)
+        if g.get(cell, INFINITY) != rhs.get(cell, INFINITY):
+            self.open_nodes.insert(cell)
+
+    def cells_changed(self, cells):
+        """ Tells the planner that *cells* have turned into walls or open cells. Call this after
+            GridGraph.set_passable; the path is repaired on the next plan().
+        """
+        graph = self.graph
+        for cell in cells:
+            self.update_cell(cell)
+
+            # A cell's mask lists its passable neighbors whether or not it is passable itself
+            for offset in graph.mask_offsets[graph.neighbor_masks[cell]]:
+                self.update_cell(cell + offset)
+
+    def move_start(self, pos):
+        """ Moves the start to the (x, y) position *pos*, such as the next cell of the last path. """
+        start = self.graph.cell_id(pos)
+        self.km += self.h(self.last_start, start)
+        self.last_start = start
+        self.start = start
+
+    def compute_shortest_path(self):
+        """ Expands inconsistent cells until the start is consistent and no open cell could still improve
+            it. Returns the number of iterations taken.
+        """
+        g, rhs, open_nodes = self.g, self.rhs, self.open_nodes
+
+        iterations = 0
+        while len(open_nodes) > 0:
+            start = self.start
+            top_key = open_nodes.minPriority()
+            if top_key >= self.calculate_key(start) and rhs.get(start, INFINITY) == g.get(start, INFINITY):
+                break
+
+            iterations += 1
+
+            cell = open_nodes.popMin()
+            new_key = self.calculate_key(cell)
+
+            if top_key < new_key:
+                # The key was computed for an earlier start; queue the cell again with its current key
+                open_nodes.insert(cell)
+            elif g.get(cell, INFINITY) > rhs[cell]:
+                g[cell] = rhs[cell]
+                for neighbor in self.neighbors(cell):
+                    self.update_cell(neighbor)
+            else:
+                g[cell] = INFINITY
+                self.update_cell(cell)
+                for neighbor in self.neighbors(cell):
+                    self.update_cell(neighbor)
+
+        return iterations
+
+    def plan(self):
+        """ Brings the search up to date with every change since the last plan, and returns a tuple of the
+            path, ordered from the goal back to the start like SearchableMaze.find_path, and the number of
+            iterations this took. The path is None if the goal cannot be reached.
+        """
+        iterations = self.compute_shortest_path()
+
+        g = self.g
+        cell = self.start
+        if g.get(cell, INFINITY) == INFINITY:
+            return (None, iterations)
+
+        # Walk down the distances to the goal
+        path = [cell]
+        while cell != self.goal:
+            cell = min(self.neighbors(cell), key=lambda neighbor: g.get(neighbor, INFINITY))
+            if g.get(cell, INFINITY) == INFINITY: return (None, iterations)
+            path.append(cell)
+
+        return ([self.graph.position(cell) for cell in reversed(path)], iterations)
@@ -0,0 +1,305 @@
+#
+# This module contains GridGraph, a compact representation of a maze stored in flat typed arrays indexed by cell id.
+#
+
+from array import array
+from itertools import compress
+from maze import Block, Direction
+
+# distances_from only uses the NumPy wavefront on grids of at least WAVEFRONT_MIN_CELLS cells, of which at least
+# WAVEFRONT_MIN_OPEN have all four neighbors open. A perfect maze is almost all corridors, where a wavefront
+# advances a handful of cells per step and the plain loop is faster; open areas are where the wavefront pays off.
+WAVEFRONT_MIN_CELLS = 1 << 18
+WAVEFRONT_MIN_OPEN = 0.05
+
+# 1 for neighbor masks with all four directions set
+FULL_MASKS = bytes(1 if mask == 0b1111 else 0 for mask in range(256))
+
+# Offset of the neighboring cell in each direction, as (x, y).
+DIRECTION_OFFSETS = {
+    Direction.NORTH: (0, -1),
+    Direction.EAST: (1, 0),
+    Direction.SOUTH: (0, 1),
+    Direction.WEST: (-1, 0),
+}
+
+# Order in which neighbors are visited. This matches the order SearchableMaze has always used.
+NEIGHBOR_ORDER = (Direction.EAST, Direction.WEST, Direction.SOUTH, Direction.NORTH)
+
+# Translation table mapping every block type to 1 if it can be walked on, and 0 otherwise.
+PASSABLE_TABLE = bytes(0 if block == Block.WALL else 1 for block in range(256))
+
+def neighbor_offsets(width):
+    """ Returns the cell id offset of the neighbor in each direction, indexed by Direction, and for each of
+        the 16 possible neighbor masks, the offsets of the neighbors it contains, for a grid *width* cells wide.
+    """
+    offsets = tuple(dy * width + dx for dx, dy in (DIRECTION_OFFSETS[d] for d in Direction))
+    mask_offsets = tuple(
+        tuple(offsets[d] for d in NEIGHBOR_ORDER if mask & (1 << d))
+        for mask in range(16)
+    )
+    return (offsets, mask_offsets)
+
+class Node:
+    """Node
+        A single cell of a GridGraph. Nodes are only created when requested through GridGraph.node(),
+        and look their neighbors up through the graph on first access.
+    """
+    __slots__ = ('pos', 'block', 'h', 'g', 'f', 'parent', 'graph', '_neighbors')
+
+    def __init__(self, pos=[-1,-1], block=Block.PATH, graph=None):
+        self.pos = pos[:]
+        self.block = block
+
+        self.h = float('inf')
+        self.g = 1
+        self.f = 0
+
+        self.parent = None
+
+        self.graph = graph
+        self._neighbors = None if graph else []
+
+    @property
+    def neighbors(self):
+        if self._neighbors is None:
+            cell = self.graph.cell_id(self.pos)
+            self._neighbors = [self.graph.node(self.graph.position(n)) for n in self.graph.neighbors(cell)]
+        return self._neighbors
+
+    @neighbors.setter
+    def neighbors(self, neighbors):
+        self._neighbors = neighbors
+
+    def print_path(self):
+        if self.parent:
+            return f"{self.pos} -> {self.parent.print_path()}"
+
+    def get_path(self):
+        """ Returns an array representing the path to this node. """
+        path = [self.pos]
+        temp = self.parent
+        while temp != None:
+            path.append(temp.pos)
+            temp = temp.parent
+
+        return path
+
+def row_neighbor_masks(north, row, south, west_edge=0, east_edge=0):
+    """ Returns the neighbor masks of a row of cells as bytes, from the passability bytes of the row and of
+        the rows above and below it, which are all zeros at the edges of the grid. *west_edge* and *east_edge*
+        are the passability of the cells just beyond the ends of the row, for a row taken from the middle
+        of the grid.
+
+        Each row is read as a big integer with one byte per cell. Because every byte is 0 or 1, the four
+        shifted neighbor rows can be added together without carries between cells.
+    """
+    width = len(row)
+    if not width: return b''
+    east = row[1:] + bytes((east_edge,))
+    west = bytes((west_edge,)) + row[:-1]
+
+    mask = (int.from_bytes(north, 'big') << Direction.NORTH) \
+        + (int.from_bytes(east, 'big') << Direction.EAST) \
+        + (int.from_bytes(south, 'big') << Direction.SOUTH) \
+        + (int.from_bytes(west, 'big') << Direction.WEST)
+    return mask.to_bytes(width, 'big')
+
+class GridGraph:
+    """GridGraph
+        Stores a maze matrix as flat arrays indexed by cell id, where cell id = y * width + x:
+
+        passable        one byte per cell, 1 if the cell is not a wall
+        neighbor_masks  one byte per cell, with bit Direction.X set if the neighbor in that direction is passable
+
+        The graph is never written to by a search; per-query state lives in a SearchContext. Both arrays
+        are built from *matrix* row by row. from_buffers() builds a graph over arrays already in this
+        format instead, such as those of a maze file saved with its graph, without copying them.
+    """
+    # False for graphs that cannot label connected components, such as TiledGraph
+    has_components = True
+
+    def __init__(self, matrix):
+        self.height = len(matrix)
+        self.width = len(matrix[0]) if self.height else 0
+        self.size = self.width * self.height
+
+        width = self.width
+
+        self.passable = bytearray(self.size)
+        for y, row in enumerate(matrix):
+            self.passable[y * width:(y + 1) * width] = bytes(row).translate(PASSABLE_TABLE)
+
+        self.neighbor_masks = self.__generate_neighbor_masks()
+
+        self.offsets, self.mask_offsets = neighbor_offsets(width)
+
+        self.nodes = {}
+        self.__components = None
+
+    @classmethod
+    def from_buffers(cls, width, height, passable, neighbor_masks, components=None):
+        """ Builds a graph over existing passable and neighbor mask buffers, and optionally component labels,
+            such as views onto shared memory, without copying or recomputing them.
+        """
+        graph = cls.__new__(cls)
+        graph.width = width
+        graph.height = height
+        graph.size = width * height
+
+        graph.passable = passable
+        graph.neighbor_masks = neighbor_masks
+        graph.offsets, graph.mask_offsets = neighbor_offsets(width)
+
+        graph.nodes = {}
+        graph.__components = components
+        return graph
+
+    def __generate_neighbor_masks(self):
+        """ Builds the neighbor bitmask of every cell, one row at a time. """
+        width = self.width
+        masks = bytearray(self.size)
+        empty = bytes(width)
+
+        for y in range(0, self.height):
+            row = bytes(self.passable[y * width:(y + 1) * width])
+            north = bytes(self.passable[(y - 1) * width:y * width]) if y > 0 else empty
+            south = bytes(self.passable[(y + 1) * width:(y + 2) * width]) if y < self.height - 1 else empty
+            masks[y * width:(y + 1) * width] = row_neighbor_masks(north, row, south)
+
+        return masks
+
+    @property
+    def components(self):
+        """ An array('i') labelling every passable cell with the id of its connected component, and every
+            wall with -1. It is computed by a single flood fill the first time it is requested.
+        """
+        if self.__components is None:
+            self.__components = self.__label_components()
+        return self.__components
+
+    def __label_components(self):
+        neighbor_masks, mask_offsets = self.neighbor_masks, self.mask_offsets
+
+        labels = array('i', [-1]) * self.size
+        label = 0
+
+        # compress() rather than find(), which the memoryviews of from_buffers() do not have
+        for cell in compress(range(self.size), self.passable):
+            if labels[cell] == -1:
+                labels[cell] = label
+                frontier = [cell]
+                while frontier:
+                    current = frontier.pop()
+                    for offset in mask_offsets[neighbor_masks[current]]:
+                        neighbor = current + offset
+                        if labels[neighbor] == -1:
+                            labels[neighbor] = label
+                            frontier.append(neighbor)
+                label += 1
+
+        return labels
+
+    def connected(self, a_cell, b_cell):
+        """ Returns True if both cells are passable and a path joins them. """
+        components = self.components
+        return components[a_cell] != -1 and components[a_cell] == components[b_cell]
+
+    def cell_id(self, pos):
+        """ Returns the cell id of an (x, y) position. """
+        return pos[1] * self.width + pos[0]
+
+    def position(self, cell):
+        """ Returns the [x, y] position of a cell id. """
+        y, x = divmod(cell, self.width)
+        return [x, y]
+
+    def is_passable(self, pos):
+        return self.passable[self.cell_id(pos)] == 1
+
+    def neighbors(self, cell):
+        """ Returns the ids of the passable cells adjacent to *cell*. """
+        return [cell + offset for offset in self.mask_offsets[self.neighbor_masks[cell]]]
+
+    def set_passable(self, cell, passable):
+        """ Turns *cell* into a wall or an open cell, updating only the neighbor masks of the cells around it.
+            Returns False if the cell already was that way.
+
+            Component labels are discarded and recomputed when next needed, and the Nodes of the cell and its
+            neighbors look their neighbors up again on next access.
+        """
+        passable = 1 if passable else 0
+        if self.passable[cell] == passable: return False
+        self.passable[cell] = passable
+
+        y, x = divmod(cell, self.width)
+        changed = [cell]
+        for direction in Direction:
+            dx, dy = DIRECTION_OFFSETS[direction]
+            if not (0 <= x + dx < self.width and 0 <= y + dy < self.height): continue
+
+            # The neighbor sees this cell in the opposite direction
+            neighbor = cell + self.offsets[direction]
+            bit = 1 << ((direction + 2) % 4)
+            if passable:
+                self.neighbor_masks[neighbor] |= bit
+            else:
+                self.neighbor_masks[neighbor] &= ~bit
+            changed.append(neighbor)
+
+        for changed_cell in changed:
+            node = self.nodes.get(changed_cell)
+            if node is not None:
+                node.block = Block.PATH if self.passable[changed_cell] else Block.WALL
+                node.neighbors = None
+
+        self.__components = None
+        return True
+
+    def node(self, pos):
+        """ Returns the Node at *pos*, creating it on first use. """
+        cell = self.cell_id(pos)
+        node = self.nodes.get(cell)
+        if node is None:
+            block = Block.PATH if self.passable[cell] else Block.WALL
+            node = Node(list(pos), block, self)
+            self.nodes[cell] = node
+        return node
+
+    def distances_from(self, cells, use_wavefront=None):
+        """ Breadth first search from every cell in *cells* at once. Returns an array('i') holding the number
+            of steps from the nearest of them to every cell, or -1 for cells that cannot be reached.
+
+            The search can also run as a vectorized NumPy wavefront, which is faster on large grids with open
+            areas and slower on corridor mazes. By default it is used, if NumPy is installed, on grids passing
+            WAVEFRONT_MIN_CELLS and WAVEFRONT_MIN_OPEN; *use_wavefront* True or False overrides this.
+        """
+        if use_wavefront is None:
+            use_wavefront = self.size >= WAVEFRONT_MIN_CELLS and isinstance(self.neighbor_masks, bytearray) and \
+                self.neighbor_masks.translate(FULL_MASKS).count(1) >= WAVEFRONT_MIN_OPEN * self.size
+
+        if use_wavefront and isinstance(self.passable, bytearray):
+            import wavefront # imported here, so that NumPy is only loaded when it is used
+            if wavefront.AVAILABLE:
+                return wavefront.graph_distances(self, cells)
+
+        neighbor_masks, mask_offsets = self.neighbor_masks, self.mask_offsets
+
+        distances = array('i', [-1]) * self.size
+        frontier = list(cells)
+        for cell in frontier:
+            distances[cell] = 0
+
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for cell in frontier:
+                for offset in mask_offsets[neighbor_masks[cell]]:
+                    neighbor = cell + offset
+                    if distances[neighbor] == -1:
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return distances
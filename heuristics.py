@@ -0,0 +1,77 @@
+#
+# This module contains the heuristics SearchableMaze can use to estimate the distance remaining to a goal.
+#
+
+import math
+
+def euclidean(pos, goal):
+    """ Straight line distance between two points. """
+    return math.hypot(goal[0] - pos[0], goal[1] - pos[1])
+
+def manhattan(pos, goal):
+    """ Sum of the horizontal and vertical offsets between two points. This is the exact distance
+        on an open grid with 4-connected moves, and so the tightest admissible choice for a maze.
+    """
+    return abs(goal[0] - pos[0]) + abs(goal[1] - pos[1])
+
+HEURISTICS = {
+    "euclidean": euclidean,
+    "manhattan": manhattan,
+}
+
+def get_heuristic(heuristic):
+    """ Returns the heuristic function named by *heuristic*, or *heuristic* itself if it is callable.
+
+        A callable heuristic takes two (x, y) positions, a cell and the goal, and returns an estimate of
+        the distance between them that never exceeds the true path length.
+    """
+    if callable(heuristic):
+        return heuristic
+    try:
+        return HEURISTICS[heuristic]
+    except KeyError:
+        raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {sorted(HEURISTICS)} or a callable.")
+
+def cell_heuristic(graph, heuristic, to_point):
+    """ Returns a function giving the heuristic value of a cell id of *graph* towards *to_point*.
+        Values are computed when a search asks for them, never for the whole grid up front.
+    """
+    width = graph.width
+    goal_x, goal_y = to_point[0], to_point[1]
+    heuristic = get_heuristic(heuristic)
+
+    # The built-in heuristics are inlined to avoid building a position tuple per call.
+    if heuristic is manhattan:
+        def h(cell):
+            y, x = divmod(cell, width)
+            return abs(goal_x - x) + abs(goal_y - y)
+    elif heuristic is euclidean:
+        def h(cell):
+            y, x = divmod(cell, width)
+            return math.hypot(goal_x - x, goal_y - y)
+    else:
+        goal = (goal_x, goal_y)
+        def h(cell):
+            y, x = divmod(cell, width)
+            return heuristic((x, y), goal)
+    return h
+
+def integer_heuristic(heuristic, scale=1):
+    """ Returns a cell heuristic giving *heuristic* times *scale*, rounded down to an integer for use with a
+        BucketQueue. Rounding down keeps an admissible, consistent heuristic so over integer edge costs.
+    """
+    def h(cell):
+        return int(scale * heuristic(cell))
+    return h
+
+def min_heuristic(heuristics):
+    """ Returns a function giving the smallest value of several cell heuristics, such as one per goal of a
+        multi-goal search. The minimum of admissible heuristics is admissible for every one of their goals.
+    """
+    heuristics = tuple(heuristics)
+    if len(heuristics) == 1:
+        return heuristics[0]
+
+    def h(cell):
+        return min([heuristic(cell) for heuristic in heuristics])
+    return h
@@ -0,0 +1,261 @@
+#
+# This module contains ClusterGraph, the abstraction layer used for hierarchical pathfinding (HPA*) on large mazes.
+#
+
+from collections import deque
+from maze import Direction
+from priorityqueue import PriorityQueue, identity_key
+
+# Entrances at least this wide get a transition at each end instead of a single one in the middle.
+WIDE_ENTRANCE = 6
+
+class ClusterGraph:
+    """ClusterGraph
+        Splits a GridGraph into square clusters of *cluster_size* cells. Each run of passable cells facing
+        passable cells across a cluster border gets one or two transitions: pairs of adjacent cells, one in
+        each cluster, joined by an inter-cluster edge of cost 1. The transition cells
+        of a cluster are its abstract nodes, and the shortest distance between every pair of them, moving
+        only inside the cluster, is precomputed as an intra-cluster edge.
+
+        Queries search this abstract graph and only then refine each abstract edge into cells, so their
+        cost grows with the number of clusters a path crosses. Paths are near-optimal rather than exact,
+        as they must cross borders at transitions.
+
+        transitions  (cluster, Direction.EAST or Direction.SOUTH) -> [(cell, cell across the border), ...]
+        nodes        cluster -> set of the abstract node cells in that cluster
+        inter        abstract node -> set of the abstract nodes it is joined to across borders
+        intra        abstract node -> {abstract node in the same cluster: distance}
+    """
+    def __init__(self, graph, cluster_size=16):
+        self.graph = graph
+        self.cluster_size = cluster_size
+
+        self.columns = -(-graph.width // cluster_size)
+        self.rows = -(-graph.height // cluster_size)
+
+        self.transitions = {}
+        self.nodes = [set() for cluster in range(0, self.columns * self.rows)]
+        self.inter = {}
+        self.intra = {}
+
+        for cluster in range(0, len(self.nodes)):
+            self.__build_border(cluster, Direction.EAST)
+            self.__build_border(cluster, Direction.SOUTH)
+
+        for cluster in range(0, len(self.nodes)):
+            self.__build_intra_edges(cluster)
+
+    def cluster_of(self, cell):
+        """ Returns the index of the cluster containing *cell*. """
+        y, x = divmod(cell, self.graph.width)
+        return (y // self.cluster_size) * self.columns + x // self.cluster_size
+
+    def bounds(self, cluster):
+        """ Returns the (min_x, min_y, max_x, max_y) of the cells in *cluster*, inclusive. """
+        cluster_y, cluster_x = divmod(cluster, self.columns)
+        min_x = cluster_x * self.cluster_size
+        min_y = cluster_y * self.cluster_size
+        max_x = min(min_x + self.cluster_size, self.graph.width) - 1
+        max_y = min(min_y + self.cluster_size, self.graph.height) - 1
+        return (min_x, min_y, max_x, max_y)
+
+    def rebuild_cluster(self, cluster):
+        """ Recomputes the transitions on the borders of *cluster*, then the intra-cluster edges of it and
+            its neighbors. Call this after the cells of a single cluster change.
+        """
+        cluster_y, cluster_x = divmod(cluster, self.columns)
+
+        borders = [(cluster, Direction.EAST), (cluster, Direction.SOUTH)]
+        affected = [cluster]
+        if cluster_x > 0:
+            borders.append((cluster - 1, Direction.EAST))
+            affected.append(cluster - 1)
+        if cluster_y > 0:
+            borders.append((cluster - self.columns, Direction.SOUTH))
+            affected.append(cluster - self.columns)
+        if cluster_x < self.columns - 1: affected.append(cluster + 1)
+        if cluster_y < self.rows - 1: affected.append(cluster + self.columns)
+
+        for border in borders:
+            self.__clear_border(*border)
+            self.__build_border(*border)
+
+        for cluster in affected:
+            self.__build_intra_edges(cluster)
+
+    def __build_border(self, cluster, direction):
+        """ Places the transitions on the east or south border of *cluster*. """
+        graph = self.graph
+        passable = graph.passable
+        cluster_y, cluster_x = divmod(cluster, self.columns)
+        min_x, min_y, max_x, max_y = self.bounds(cluster)
+
+        if direction == Direction.EAST:
+            if cluster_x == self.columns - 1: return
+            neighbor_cluster = cluster + 1
+            border = [graph.cell_id((max_x, y)) for y in range(min_y, max_y + 1)]
+        else:
+            if cluster_y == self.rows - 1: return
+            neighbor_cluster = cluster + self.columns
+            border = [graph.cell_id((x, max_y)) for x in range(min_x, max_x + 1)]
+        offset = graph.offsets[direction]
+
+        # Split the border into runs of cells that are passable on both sides
+        entrances = []
+        run = []
+        for cell in border:
+            if passable[cell] and passable[cell + offset]:
+                run.append(cell)
+            elif run:
+                entrances.append(run)
+                run = []
+        if run: entrances.append(run)
+
+        transitions = []
+        for run in entrances:
+            if len(run) >= WIDE_ENTRANCE:
+                transitions.append((run[0], run[0] + offset))
+                transitions.append((run[-1], run[-1] + offset))
+            else:
+                middle = run[len(run) // 2]
+                transitions.append((middle, middle + offset))
+
+        for cell, across in transitions:
+            self.inter.setdefault(cell, set()).add(across)
+            self.inter.setdefault(across, set()).add(cell)
+            self.nodes[cluster].add(cell)
+            self.nodes[neighbor_cluster].add(across)
+
+        self.transitions[(cluster, direction)] = transitions
+
+    def __clear_border(self, cluster, direction):
+        """ Removes the transitions on the east or south border of *cluster*, and any abstract nodes left
+            without a transition.
+        """
+        for cell, across in self.transitions.pop((cluster, direction), []):
+            for a, b in ((cell, across), (across, cell)):
+                links = self.inter.get(a)
+                if links is None: continue
+                links.discard(b)
+                if not links:
+                    del self.inter[a]
+                    self.intra.pop(a, None)
+                    self.nodes[self.cluster_of(a)].discard(a)
+
+    def __build_intra_edges(self, cluster):
+        """ Computes the in-cluster distance between every pair of abstract nodes in *cluster*. """
+        nodes = self.nodes[cluster]
+        for node in nodes:
+            distances, parents = self.cluster_search(node, cluster)
+            self.intra[node] = {other: distances[other] for other in nodes if other != node and other in distances}
+
+    def cluster_search(self, from_cell, cluster, to_cell=-1):
+        """ Breadth first search from *from_cell* that never leaves *cluster*, stopping early at *to_cell*.
+            Returns dicts of the distance and parent of every cell reached.
+        """
+        graph = self.graph
+        width = graph.width
+        neighbor_masks, mask_offsets = graph.neighbor_masks, graph.mask_offsets
+        min_x, min_y, max_x, max_y = self.bounds(cluster)
+
+        distances = {from_cell: 0}
+        parents = {from_cell: -1}
+        frontier = deque([from_cell])
+        while frontier:
+            cell = frontier.popleft()
+            if cell == to_cell: break
+
+            distance = distances[cell] + 1
+            for offset in mask_offsets[neighbor_masks[cell]]:
+                neighbor = cell + offset
+                if neighbor in distances: continue
+
+                y, x = divmod(neighbor, width)
+                if x < min_x or x > max_x or y < min_y or y > max_y: continue
+
+                distances[neighbor] = distance
+                parents[neighbor] = cell
+                frontier.append(neighbor)
+
+        return (distances, parents)
+
+    def find_abstract_path(self, from_cell, to_cell, heuristic, stats=None):
+        """ Finds the shortest route between two passable cells through the abstract graph. The start and
+            goal are connected to the abstract nodes of their clusters for this query only.
+
+            Returns a tuple of the list of cells the route passes through, starting with *from_cell* and
+            ending with *to_cell*, or None if there is none, and the number of abstract nodes expanded.
+            The search's counts are added to *stats*, a SearchStats, if given.
+        """
+        from_cluster = self.cluster_of(from_cell)
+        to_cluster = self.cluster_of(to_cell)
+
+        distances, parents = self.cluster_search(from_cell, from_cluster)
+        start_edges = {node: distances[node] for node in self.nodes[from_cluster] if node in distances}
+        if from_cluster == to_cluster and to_cell in distances:
+            start_edges[to_cell] = distances[to_cell]
+
+        distances, parents = self.cluster_search(to_cell, to_cluster)
+        goal_edges = {node: distances[node] for node in self.nodes[to_cluster] if node in distances}
+
+        g = {from_cell: 0}
+        parent = {from_cell: -1}
+        open_nodes = PriorityQueue(identity_key, lambda cell: g[cell] + heuristic(cell))
+        closed_nodes = set()
+        open_nodes.insert(from_cell)
+
+        iterations = 0
+        path = None
+
+        while open_nodes:
+            iterations += 1
+
+            q = open_nodes.popMin()
+            closed_nodes.add(q)
+
+            if q == to_cell:
+                path = []
+                while q != -1:
+                    path.append(q)
+                    q = parent[q]
+                path.reverse()
+                break
+
+            edges = list(self.intra.get(q, {}).items())
+            edges.extend((across, 1) for across in self.inter.get(q, ()))
+            if q == from_cell:
+                edges.extend(start_edges.items())
+            if q in goal_edges:
+                edges.append((to_cell, goal_edges[q]))
+
+            for neighbor, cost in edges:
+                if neighbor in closed_nodes: continue
+
+                neighbor_g = g[q] + cost
+                existing_g = g.get(neighbor)
+                if existing_g is None or neighbor_g < existing_g:
+                    g[neighbor] = neighbor_g
+                    parent[neighbor] = q
+                    open_nodes.insert(neighbor)
+
+        if stats is not None:
+            stats.record_queue(open_nodes, len(g), len(closed_nodes))
+
+        return (path, iterations)
+
+    def refine(self, abstract_path):
+        """ Yields every cell of the path through the cells of *abstract_path*, refining one abstract edge
+            at a time, so callers can start using the path before it is fully expanded.
+        """
+        yield abstract_path[0]
+        for cell, next_cell in zip(abstract_path, abstract_path[1:]):
+            if next_cell in self.inter.get(cell, ()):
+                yield next_cell
+                continue
+
+            distances, parents = self.cluster_search(cell, self.cluster_of(cell), next_cell)
+            segment = []
+            while next_cell != cell:
+                segment.append(next_cell)
+                next_cell = parents[next_cell]
+            yield from reversed(segment)
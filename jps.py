@@ -0,0 +1,178 @@
+#
+# This module contains jump point search (JPS) for 4-connected, uniform-cost grids, and the jump distance
+# tables used by its precomputed variant, JPS+.
+#
+
+from array import array
+from maze import Direction
+from searchcontext import SearchContext
+
+HORIZONTAL_BITS = (1 << Direction.EAST) | (1 << Direction.WEST)
+VERTICAL_BITS = (1 << Direction.NORTH) | (1 << Direction.SOUTH)
+
+# Directions a search continues in after reaching a jump point travelling in a given direction.
+# Travelling horizontally, vertical moves are only ever taken at jump points, so both are tried there.
+# Travelling vertically, horizontal moves are natural neighbors of every cell.
+SUCCESSOR_DIRECTIONS = {
+    None: tuple(Direction),
+    Direction.NORTH: (Direction.NORTH, Direction.EAST, Direction.WEST),
+    Direction.SOUTH: (Direction.SOUTH, Direction.EAST, Direction.WEST),
+    Direction.EAST: (Direction.EAST, Direction.NORTH, Direction.SOUTH),
+    Direction.WEST: (Direction.WEST, Direction.NORTH, Direction.SOUTH),
+}
+
+def is_horizontal(direction):
+    return direction == Direction.EAST or direction == Direction.WEST
+
+class JumpDistances:
+    """JumpDistances
+        Precomputed jump distances of every cell of a GridGraph, for JPS+.
+
+        distances[direction][cell] is d > 0 if the first goal-independent jump point in that direction
+        is d cells away, and -d if there is none and the next wall is d + 1 cells away.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.distances = [None] * len(Direction)
+
+        # Vertical jump points depend on the horizontal tables, so those are built first.
+        for direction in (Direction.EAST, Direction.WEST, Direction.NORTH, Direction.SOUTH):
+            self.distances[direction] = self.__generate_distances(direction)
+
+    def __generate_distances(self, direction):
+        graph = self.graph
+        masks = graph.neighbor_masks
+        offset = graph.offsets[direction]
+        bit = 1 << direction
+
+        horizontal = is_horizontal(direction)
+        side_bits = VERTICAL_BITS if horizontal else HORIZONTAL_BITS
+        east = self.distances[Direction.EAST]
+        west = self.distances[Direction.WEST]
+
+        distances = array('i', [0]) * graph.size
+
+        # Each cell's distance is derived from the next cell's, so cells are visited against the direction.
+        cells = range(graph.size - 1, -1, -1) if offset > 0 else range(0, graph.size)
+        for cell in cells:
+            mask = masks[cell]
+            if not mask & bit: continue
+
+            next_cell = cell + offset
+            if masks[next_cell] & side_bits & ~mask:
+                distances[cell] = 1
+            elif not horizontal and (east[next_cell] > 0 or west[next_cell] > 0):
+                distances[cell] = 1
+            else:
+                distance = distances[next_cell]
+                distances[cell] = distance + 1 if distance > 0 else distance - 1
+
+        return distances
+
+class JumpPointContext(SearchContext):
+    """JumpPointContext
+        A SearchContext whose successors are jump points rather than adjacent cells.
+
+        A cell travelled through horizontally is a jump point if a vertical neighbor is open there but not
+        beside the previous cell. A cell travelled through vertically is a jump point under the same rule
+        for horizontal neighbors, or if a horizontal jump from it reaches a jump point. The goal is always
+        a jump point. Pass *jump_distances* to read jumps from a JumpDistances table instead of scanning.
+    """
+    def __init__(self, graph, from_cell, to_cell, heuristic, jump_distances=None):
+        super().__init__(graph, from_cell, heuristic)
+        self.to_cell = to_cell
+        self.jump_distances = jump_distances
+
+        # The direction each cell was reached in, used for pruning and to expand the path
+        self.direction = {from_cell: None}
+
+    def relax(self, cell):
+        """ Jumps from *cell* in every unpruned direction, opening the jump points found.
+            Returns the jump points whose g was set.
+        """
+        g, parent, open_nodes, closed_nodes = self.g, self.parent, self.open_nodes, self.closed_nodes
+        offsets = self.graph.offsets
+        jump = self.jump if self.jump_distances is None else self.jump_plus
+
+        updated = []
+        for direction in SUCCESSOR_DIRECTIONS[self.direction[cell]]:
+            jump_point = jump(cell, direction)
+            if jump_point == -1 or jump_point in closed_nodes: continue
+
+            jump_point_g = g[cell] + (jump_point - cell) // offsets[direction]
+            existing_g = g.get(jump_point)
+            if existing_g is None or jump_point_g < existing_g:
+                g[jump_point] = jump_point_g
+                parent[jump_point] = cell
+                self.direction[jump_point] = direction
+                open_nodes.insert(jump_point)
+                updated.append(jump_point)
+
+        return updated
+
+    def jump(self, cell, direction):
+        """ Moves from *cell* in *direction* until reaching a jump point. Returns its id, or -1 at a dead end. """
+        masks = self.graph.neighbor_masks
+        offset = self.graph.offsets[direction]
+        bit = 1 << direction
+
+        horizontal = is_horizontal(direction)
+        side_bits = VERTICAL_BITS if horizontal else HORIZONTAL_BITS
+
+        previous = cell
+        while masks[previous] & bit:
+            cell = previous + offset
+            if cell == self.to_cell: return cell
+
+            if masks[cell] & side_bits & ~masks[previous]: return cell
+
+            if not horizontal:
+                if self.jump(cell, Direction.EAST) != -1 or self.jump(cell, Direction.WEST) != -1:
+                    return cell
+
+            previous = cell
+
+        return -1
+
+    def jump_plus(self, cell, direction):
+        """ Same as jump(), but reads the jump from the precomputed table, only checking for the goal. """
+        width = self.graph.width
+        distances = self.jump_distances.distances
+        offset = self.graph.offsets[direction]
+
+        distance = distances[direction][cell]
+        reach = distance if distance > 0 else -distance
+
+        y, x = divmod(cell, width)
+        goal_y, goal_x = divmod(self.to_cell, width)
+
+        if is_horizontal(direction):
+            # The goal is a jump point if it lies ahead in this row, before the next jump point or wall.
+            if goal_y == y and 0 < (goal_x - x) * offset <= reach:
+                return self.to_cell
+        else:
+            # The cell level with the goal is a jump point if the goal can be reached horizontally from it.
+            steps = (goal_y - y) * (1 if offset > 0 else -1)
+            if 0 < steps <= reach:
+                level_cell = cell + steps * offset
+                if goal_x == x: return level_cell
+
+                goal_direction = Direction.EAST if goal_x > x else Direction.WEST
+                if abs(goal_x - x) <= abs(distances[goal_direction][level_cell]):
+                    return level_cell
+
+        return cell + distance * offset if distance > 0 else -1
+
+    def get_path(self, cell):
+        """ Returns an array of positions from *cell* back to the start of the search,
+            including every cell between consecutive jump points.
+        """
+        path = []
+        while self.parent[cell] != -1:
+            parent = self.parent[cell]
+            offset = self.graph.offsets[self.direction[cell]]
+            while cell != parent:
+                path.append(self.graph.position(cell))
+                cell -= offset
+        path.append(self.graph.position(cell))
+        return path
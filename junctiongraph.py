@@ -0,0 +1,228 @@
+#
+# This module contains JunctionGraph, a contraction of a GridGraph in which every corridor is collapsed into
+# a single weighted edge between the junctions at its ends.
+#
+
+from array import array
+from priorityqueue import PriorityQueue, identity_key
+
+# Maps (passable << 4 | neighbor mask) to 1 for passable cells that do not have exactly two passable neighbors.
+JUNCTION_TABLE = bytes(
+    1 if value & 16 and bin(value & 15).count('1') != 2 else 0
+    for value in range(256)
+)
+
+class JunctionGraph:
+    """JunctionGraph
+        A passable cell with exactly two passable neighbors is a corridor cell; every other passable cell
+        is a junction (dead ends included). Each run of corridor cells, and each pair of adjacent junctions,
+        becomes one edge whose cost is the number of steps between its two junctions. A loop of corridor
+        cells with no junction on it has one of its cells promoted to a junction.
+
+        Edges are stored in flat arrays indexed by edge id:
+
+        edge_a, edge_b  the junctions at either end of the edge
+        edge_length     the number of steps from edge_a to edge_b
+        edge_first      the cell one step from edge_a along the edge
+
+        and corridor cells record the edge they lie on in *corridor*, and their distance from its edge_a
+        in *offset*.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+        masks = int.from_bytes(graph.neighbor_masks, 'big')
+        passable = int.from_bytes(graph.passable, 'big')
+        self.is_junction = bytearray(((passable << 4) + masks).to_bytes(graph.size, 'big').translate(JUNCTION_TABLE))
+
+        self.corridor = array('i', [-1]) * graph.size
+        self.offset = array('i', [0]) * graph.size
+
+        self.edge_a = array('i')
+        self.edge_b = array('i')
+        self.edge_length = array('i')
+        self.edge_first = array('i')
+
+        # junction -> ids of the edges meeting it
+        self.edges = {}
+
+        # Cells already assigned to a junction or an edge, used to find loops with no junction on them
+        assigned = bytearray(self.is_junction)
+
+        cell = self.is_junction.find(1)
+        while cell != -1:
+            self.__add_edges(cell, assigned)
+            cell = self.is_junction.find(1, cell + 1)
+
+        unassigned = (passable & ~int.from_bytes(assigned, 'big')).to_bytes(graph.size, 'big')
+        cell = unassigned.find(1)
+        while cell != -1:
+            if not assigned[cell]:
+                self.is_junction[cell] = 1
+                assigned[cell] = 1
+                self.__add_edges(cell, assigned)
+            cell = unassigned.find(1, cell + 1)
+
+    def __add_edges(self, junction, assigned):
+        """ Follows each corridor leaving *junction* that has not been followed yet, adding it as an edge. """
+        graph = self.graph
+        self.edges.setdefault(junction, [])
+
+        for neighbor in graph.neighbors(junction):
+            if self.is_junction[neighbor]:
+                # Adjacent junctions are joined by an edge of length 1, added once from the lower id.
+                if junction < neighbor:
+                    self.__add_edge(junction, neighbor, 1, neighbor)
+                continue
+
+            if self.corridor[neighbor] != -1: continue
+
+            edge = len(self.edge_a)
+            length = 1
+            previous, cell = junction, neighbor
+            while not self.is_junction[cell]:
+                self.corridor[cell] = edge
+                self.offset[cell] = length
+                assigned[cell] = 1
+
+                a, b = graph.neighbors(cell)
+                previous, cell = cell, (b if a == previous else a)
+                length += 1
+
+            self.__add_edge(junction, cell, length, neighbor)
+
+    def __add_edge(self, a, b, length, first):
+        edge = len(self.edge_a)
+        self.edge_a.append(a)
+        self.edge_b.append(b)
+        self.edge_length.append(length)
+        self.edge_first.append(first)
+
+        self.edges.setdefault(a, []).append(edge)
+        if b != a:
+            self.edges.setdefault(b, []).append(edge)
+
+    def edge_cells(self, edge):
+        """ Returns every cell of *edge*, from edge_a to edge_b inclusive, so that a cell's index is its offset. """
+        graph = self.graph
+        cells = [self.edge_a[edge]]
+        previous, cell = self.edge_a[edge], self.edge_first[edge]
+        while not self.is_junction[cell]:
+            cells.append(cell)
+            a, b = graph.neighbors(cell)
+            previous, cell = cell, (b if a == previous else a)
+        cells.append(cell)
+        return cells
+
+    def segment(self, edge, from_offset, to_offset):
+        """ Returns the cells of *edge* between two offsets, inclusive, in the order travelled. """
+        cells = self.edge_cells(edge)
+        if from_offset <= to_offset:
+            return cells[from_offset:to_offset + 1]
+        return cells[to_offset:from_offset + 1][::-1]
+
+    def attachments(self, cell):
+        """ Returns the junctions a cell is attached to, as a dict of junction -> (distance, edge, offset),
+            where *offset* is the junction's offset along *edge*. A junction is attached to itself.
+        """
+        if self.is_junction[cell]:
+            return {cell: (0, -1, 0)}
+
+        edge = self.corridor[cell]
+        offset = self.offset[cell]
+        length = self.edge_length[edge]
+
+        attached = {self.edge_b[edge]: (length - offset, edge, length)}
+        if offset <= length - offset or self.edge_a[edge] != self.edge_b[edge]:
+            attached[self.edge_a[edge]] = (offset, edge, 0)
+        return attached
+
+    def find_path(self, from_cell, to_cell, heuristic, stats=None):
+        """ Finds the shortest path between two passable cells with A* search over the junctions.
+
+            Returns a tuple of the list of cell ids from *from_cell* to *to_cell*, or None if they are not
+            connected, and the number of junctions expanded. The search's counts are added to *stats*, a
+            SearchStats, if given.
+        """
+        if from_cell == to_cell:
+            return ([from_cell], 0)
+
+        sources = self.attachments(from_cell)
+        targets = self.attachments(to_cell)
+
+        # The cost of the best path found so far, and how to rebuild it
+        best = float('inf')
+        best_junction = -1
+
+        # Both cells on the same corridor can be joined directly along it
+        if not self.is_junction[from_cell] and self.corridor[from_cell] == self.corridor[to_cell]:
+            best = abs(self.offset[from_cell] - self.offset[to_cell])
+
+        g = {}
+        parent_edge = {}
+        open_nodes = PriorityQueue(identity_key, lambda junction: g[junction] + heuristic(junction))
+        closed_nodes = set()
+
+        for junction, (distance, edge, offset) in sources.items():
+            g[junction] = distance
+            parent_edge[junction] = -1
+            open_nodes.insert(junction)
+
+        iterations = 0
+
+        while open_nodes and open_nodes.minPriority() < best:
+            iterations += 1
+
+            q = open_nodes.popMin()
+            closed_nodes.add(q)
+
+            if q in targets and g[q] + targets[q][0] < best:
+                best = g[q] + targets[q][0]
+                best_junction = q
+
+            for edge in self.edges[q]:
+                other = self.edge_b[edge] if self.edge_a[edge] == q else self.edge_a[edge]
+                if other in closed_nodes: continue
+
+                other_g = g[q] + self.edge_length[edge]
+                existing_g = g.get(other)
+                if existing_g is None or other_g < existing_g:
+                    g[other] = other_g
+                    parent_edge[other] = edge
+                    open_nodes.insert(other)
+
+        if stats is not None:
+            stats.record_queue(open_nodes, len(g), len(closed_nodes))
+
+        if best == float('inf'):
+            return (None, iterations)
+
+        if best_junction == -1:
+            edge = self.corridor[from_cell]
+            return (self.segment(edge, self.offset[from_cell], self.offset[to_cell]), iterations)
+
+        # Walk back from the junction nearest the goal to the one the search started from
+        junctions = [best_junction]
+        edges = []
+        while parent_edge[junctions[-1]] != -1:
+            edge = parent_edge[junctions[-1]]
+            edges.append(edge)
+            junction = junctions[-1]
+            junctions.append(self.edge_b[edge] if self.edge_a[edge] == junction else self.edge_a[edge])
+        junctions.reverse()
+        edges.reverse()
+
+        distance, edge, offset = sources[junctions[0]]
+        cells = [from_cell] if edge == -1 else self.segment(edge, self.offset[from_cell], offset)
+
+        for junction, edge in zip(junctions, edges):
+            if self.edge_a[edge] == junction:
+                cells.extend(self.segment(edge, 0, self.edge_length[edge])[1:])
+            else:
+                cells.extend(self.segment(edge, self.edge_length[edge], 0)[1:])
+
+        distance, edge, offset = targets[best_junction]
+        if edge != -1:
+            cells.extend(self.segment(edge, offset, self.offset[to_cell])[1:])
+
+        return (cells, iterations)
@@ -0,0 +1,105 @@
+#
+# This module contains Landmarks, the preprocessing behind the ALT (A*, landmarks, triangle inequality) heuristic.
+#
+
+import random
+from array import array
+
+# Name under which SearchableMaze accepts the landmark heuristic.
+LANDMARKS = "landmarks"
+
+class Landmarks:
+    """Landmarks
+        Stores the exact distance from each of a few landmark cells to every cell of a GridGraph, as one
+        array('i') per landmark, with -1 for unreachable cells. By the triangle inequality, the distance
+        between two cells is at least |d(L, a) - d(L, b)| for every landmark L, which gives an admissible
+        and consistent heuristic that accounts for the walls of the maze.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to preprocess
+        count: int
+            the number of landmarks to place
+        selection: str or list
+            "farthest" to place each landmark as far as possible from those already placed, "random" to
+            pick passable cells at random, or a list of (x, y) positions to use as landmarks
+        seed: int
+            seed for the random choices made during selection
+    """
+    def __init__(self, graph, count=8, selection="farthest", seed=None):
+        self.graph = graph
+
+        passable_cells = [cell for cell, passable in enumerate(graph.passable) if passable]
+        rng = random.Random(seed)
+
+        if not passable_cells:
+            self.cells, self.distances = [], []
+            return
+
+        if selection == "farthest":
+            self.cells, self.distances = self.__select_farthest(passable_cells, count, rng)
+            return
+
+        if selection == "random":
+            self.cells = rng.sample(passable_cells, min(count, len(passable_cells)))
+        elif isinstance(selection, str):
+            raise ValueError(f"Unknown landmark selection {selection!r}, expected \"farthest\", \"random\" or a list of positions.")
+        else:
+            self.cells = [graph.cell_id(pos) for pos in selection]
+
+        self.distances = [graph.distances_from([cell]) for cell in self.cells]
+
+    @classmethod
+    def from_arrays(cls, graph, cells, distances):
+        """ Builds Landmarks over existing landmark cells and distance arrays, such as views onto shared
+            memory, without placing them or computing the distances again.
+        """
+        landmarks = cls.__new__(cls)
+        landmarks.graph = graph
+        landmarks.cells = list(cells)
+        landmarks.distances = list(distances)
+        return landmarks
+
+    def __select_farthest(self, passable_cells, count, rng):
+        """ Places the first landmark as far as possible from a random cell, and each following one at the
+            cell farthest from every landmark placed so far. Only the component of the random cell is used.
+        """
+        graph = self.graph
+        nearest = graph.distances_from([rng.choice(passable_cells)])
+
+        cells = []
+        landmark_distances = []
+        while len(cells) < count:
+            cell = max(range(0, graph.size), key=nearest.__getitem__)
+            if nearest[cell] <= 0: break
+
+            cells.append(cell)
+            distances = graph.distances_from([cell])
+            landmark_distances.append(distances)
+            if len(cells) == 1:
+                nearest = array('i', distances)
+                continue
+            for other in range(0, graph.size):
+                if distances[other] < nearest[other]:
+                    nearest[other] = distances[other]
+
+        return (cells, landmark_distances)
+
+    def cell_heuristic(self, to_cell, fallback=None):
+        """ Returns a function giving the landmark lower bound on the distance from a cell id to *to_cell*.
+            When given, the larger of this bound and *fallback*'s value is used.
+        """
+        goal_distances = [(distances, distances[to_cell]) for distances in self.distances if distances[to_cell] != -1]
+
+        def h(cell):
+            best = fallback(cell) if fallback else 0
+            for distances, goal_distance in goal_distances:
+                distance = distances[cell]
+                if distance == -1: continue
+
+                bound = distance - goal_distance if distance > goal_distance else goal_distance - distance
+                if bound > best: best = bound
+            return best
+
+        return h
@@ -5,11 +5,6 @@
 import random, math, json
 from enum import IntEnum
 
-# Used for pretty console output
-from colorama import Fore, Back, Style
-
-print(Fore.RESET, Back.RESET)
-
 class Block(IntEnum):
     """
         This enumeration is used within the Maze class for describing block types.
@@ -33,147 +28,253 @@ class Direction(IntEnum):
 class Maze:
     """Maze
         This class encapsulates a 2D matrix with helper functions for generating mazes.
+
+        Generated and binary-loaded mazes are stored one byte per cell in self.buffer, and each row of
+        self.matrix is a memoryview onto it rather than a list. Rows can be indexed, assigned, iterated
+        and measured with len() as before, but not appended to or sliced into lists; list(row) copies a
+        row into a list. Mazes loaded from JSON keep rows of lists, and self.buffer is None.
     """
     def __init__(self):
-      pass  
+        self.matrix = []
+        self.buffer = None
+        self.start = None
+        self.end = None
+
+        # Incremented whenever the cells change through this class, so that cached results can be discarded
+        self.version = 0
+
+        # Incremented only when blocks change between walls and passable blocks, so that results depending
+        # on passability alone, such as the nearest cell index, survive drawing paths and setting costs
+        self.passability_version = 0
+
+        # The cost of entering each cell, one byte per cell in the order of self.buffer, or None while every
+        # cost is 1. See set_cost.
+        self.costs = None
+
+        # The lowest of self.costs, and the version it was found for. See lowest_cost.
+        self.__lowest_cost = 1
+        self.__lowest_cost_version = None
+
+        # The passable and neighbor mask buffers of a graph loaded with the maze, and the passability version
+        # they match. See graph_buffers.
+        self.__graph_buffers = None
+        self.__graph_buffers_version = None
+
+        # The NearestCellIndex of the maze, and the passability version it was built for
+        self.__nearest_cells = None
+        self.__nearest_cells_version = None
     
-    def generate(self, dimensions, start, end):
-        """ Generates a new maze of certain dimensions. """
+    def generate(self, dimensions, start, end, algorithm="auto", seed=None):
+        """ Generates a new maze of certain dimensions.
+
+            *algorithm* is one of the linear-time algorithms in mazegen ("backtracker", "kruskal",
+            "eller" or "sidewinder", the fastest for very large mazes), "auto" for the backtracker on
+            mazes it builds within a few seconds and the sidewinder above that, or "random_walk" for the
+            original random walk with back-tracking. Passing a *seed* makes the maze reproducible. The
+            maze is stored one byte per cell in self.buffer, and each row of self.matrix is a view onto it.
+        """
 
         self.width = dimensions[1]
         self.height = dimensions[0]
-        
-        grid = self.__generate_matrix(self.width, self.height)
 
-        # Tuples are used as parameters for consistency, but certain internal operations are easier on lists.
-        start = list(start)
-        end = list(end)
-        
-        init_start = start[:]
-        init_end = end[:]
+        rng = random.Random(seed)
+
+        if algorithm == "random_walk":
+            grid = self.__generate_matrix(self.width, self.height)
 
-        self.matrix = self.__generate_maze(grid, start, end)
-       
+            # Tuples are used as parameters for consistency, but certain internal operations are easier on lists.
+            grid = self.__generate_maze(grid, list(start), list(end), rng)
+            buffer = bytearray().join(bytes(row) for row in grid)
+        else:
+            import mazegen # imported here, as mazegen depends on Block
+            buffer = mazegen.generate(dimensions[0], dimensions[1], start, end, algorithm, rng)
+
+        self.__use_buffer(buffer, dimensions[0])
+        self.costs = None
+        self.version += 1
+        self.passability_version += 1
+        self.start = tuple(start)
+        self.end = tuple(end)
 
         # Set block types for start and end.
-        self.matrix[init_start[1]][init_start[0]] = Block.GOAL
-        self.matrix[init_end[1]][init_end[0]] = Block.GOAL
-
-    def save(self, filename):
-        """ Saves a generated maze to the filesystem. """
-
-        matrix_int = self.matrix[:]
-        for row in range(0, len(self.matrix)):
-            for col in range(0, len(self.matrix[0])):
-                matrix_int[row][col] = int(self.matrix[row][col])
-        matrix_json = json.dumps(matrix_int)
-       
-        with open(filename, 'w') as file:
-            file.write(matrix_json)
-        return True
+        self.matrix[start[1]][start[0]] = Block.GOAL
+        self.matrix[end[1]][end[0]] = Block.GOAL
+
+    def __use_buffer(self, buffer, columns):
+        """ Stores a one byte per cell *buffer* as the maze, with self.matrix as a list of row views onto it. """
+        self.buffer = buffer
+        view = memoryview(buffer)
+        self.matrix = [view[row:row + columns] for row in range(0, len(buffer), columns)]
+
+    def save(self, filename, format="binary", graph=False):
+        """ Saves a generated maze to the filesystem.
+
+            *format* is "binary" for the mazefile format with one byte per cell, which load() memory-maps,
+            "packed" for the same format with one bit per cell (path blocks and walls only, plus the start
+            and end), or "json" for a nested list of block values. The binary formats also save the costs
+            set with set_cost; JSON holds the blocks alone, and a maze loaded from it has every cost 1.
+
+            With *graph*, the GridGraph's passable map and neighbor masks are saved as well, two more bytes
+            per cell, so that a SearchableMaze over the loaded binary maze searches the memory-mapped file
+            directly instead of building its graph as a copy of the cells.
+        """
 
-    def load(self, filename):
-        """ Loads a pre-generated maze from the filesystem. """
-        with open(filename) as file:
-            matrix_json = file.read()
-            self.matrix = json.loads(matrix_json)
-        
-        return True
+        if format == "json":
+            matrix_int = [[int(col) for col in row] for row in self.matrix]
+            matrix_json = json.dumps(matrix_int)
 
-    def print(self):
-        """ Outputs the matrix to the console, using colorama for formatting. """
-
-        result = ""
-        for row in self.matrix:
-            for col in row:
-                if col == Block.PATH:
-                    result += Fore.WHITE
-                    result += Back.WHITE
-                elif col == Block.WALL:
-                    result += Fore.BLACK
-                    result += Back.BLACK
-                elif col == Block.GOAL:
-                    result += Fore.WHITE
-                
-                if col == Block.HIGHLIGHT_1:
-                    result += Fore.CYAN
+            if graph:
+                raise ValueError("Only the binary and packed formats can store the graph.")
 
-                if col == Block.HIGHLIGHT_2:
-                    result += Fore.BLUE
-                    result += Back.BLUE
-                
-                if col == Block.HIGHLIGHT_3:
-                    result += Fore.MAGENTA
-                    result += Back.MAGENTA
+            with open(filename, 'w') as file:
+                file.write(matrix_json)
+            return True
 
-                result += "■"
-                result += Style.RESET_ALL
+        import mazefile
 
-            result += "\n"
-        print(result)
+        if format == "binary":
+            encoding = mazefile.ENCODING_BYTES
+        elif format == "packed":
+            encoding = mazefile.ENCODING_BITS
+        else:
+            raise ValueError(f"Unknown maze format {format!r}, expected \"binary\", \"packed\" or \"json\".")
 
-    def calculate_global_mp(self):
-        """ Calculates midpoint of maze. """
+        columns = len(self.matrix[0]) if self.matrix else 0
+        buffer = self.buffer
+        if buffer is None:
+            buffer = bytearray().join(bytes(row) for row in self.matrix)
 
-        width = len(self.matrix[0])
-        height = len(self.matrix)
+        sections = {}
+        if graph:
+            from gridgraph import GridGraph # imported here, as gridgraph depends on Block
 
-        x_mid = width // 2
-        y_mid = height // 2
+            grid_graph = GridGraph(self.matrix)
+            sections[mazefile.SECTION_GRAPH] = grid_graph.passable + grid_graph.neighbor_masks
+        if self.costs is not None:
+            sections[mazefile.SECTION_COSTS] = self.costs
 
-        if self.matrix[y_mid][x_mid] == Block.PATH:
-            return (x_mid, y_mid)
+        mazefile.write(filename, buffer, columns, len(self.matrix), self.start, self.end, encoding, sections)
+        return True
 
-        search_area_bounds = 1
-        found_path = False
-        while not found_path:
-            min_row = y_mid - search_area_bounds
-            max_row = y_mid + search_area_bounds
+    def load(self, filename):
+        """ Loads a pre-generated maze from the filesystem, in any of the formats written by save().
+            Binary mazes are memory-mapped, so loading does not read the cells until they are used.
+            Searching one reads every cell once to build the SearchableMaze's graph, unless the maze was
+            saved with its graph, which is then used from the mapped file; see graph_buffers.
+        """
+        import mazefile
+
+        if not mazefile.is_maze_file(filename):
+            with open(filename) as file:
+                matrix_json = file.read()
+                self.matrix = json.loads(matrix_json)
+
+            self.buffer = None
+            self.start = self.end = None
+            self.costs = None
+            self.version += 1
+            self.passability_version += 1
+            self.width = len(self.matrix)
+            self.height = len(self.matrix[0]) if self.matrix else 0
+            self.__graph_buffers = None
+            return True
+
+        buffer, columns, rows, self.start, self.end, sections = mazefile.read(filename)
+        self.width = rows
+        self.height = columns
+        self.__use_buffer(buffer, columns)
+        self.version += 1
+        self.passability_version += 1
+
+        # Like the cells, saved costs are views onto the memory-mapped file, and set_cost writes to a copy
+        size = columns * rows
+        costs = sections.get(mazefile.SECTION_COSTS)
+        self.costs = costs if costs is not None and len(costs) == size else None
+
+        graph = sections.get(mazefile.SECTION_GRAPH)
+        self.__graph_buffers = (graph[:size], graph[size:]) if graph is not None and len(graph) == 2 * size else None
+        self.__graph_buffers_version = self.passability_version
+
+        # Bit-packed files only record passability, so the start and end are restored here.
+        for pos in (self.start, self.end):
+            if pos is not None and self.matrix[pos[1]][pos[0]] == Block.PATH:
+                self.matrix[pos[1]][pos[0]] = Block.GOAL
 
-            min_col = x_mid - search_area_bounds
-            max_col = x_mid + search_area_bounds
+        return True
 
-            for y in range(min_row, max_row):
-                for x in range(min_col, max_col):
-                    try:
-                        if self.matrix[y][x] == Block.PATH: return (x, y)
-                    except IndexError:
-                        break
+    def print(self, file=None, fit=False):
+        """ Outputs the matrix to the console, or to *file*, as colored text. With *fit*, a maze larger than
+            the terminal is downsampled to fit it. See render.write_ansi.
+        """
+        import render # imported here, so that importing maze loads no rendering code
 
-            search_area_bounds += 1
-        
+        factor = render.fit_factor(self.matrix) if fit else 1
+        render.write_ansi(self.matrix, file, factor)
 
-    def calculate_mp(self, start, end):
-        """ Calculates midpoint between two points. """
+    def save_image(self, filename, scale=1):
+        """ Saves the matrix as a PNG image if *filename* ends in .png, or as a PPM image otherwise, with
+            *scale* pixels per cell.
+        """
+        import render # imported here, so that importing maze loads no rendering code
 
-        x_offset = end[0] - start[0]
-        y_offset = end[1] - start[1]
+        render.save_image(self.matrix, filename, scale)
 
-        abs_midpoint_rows = round(y_offset // 2)
-        abs_midpoint_cols = round(x_offset // 2)
+    def nearest_cells(self):
+        """ Returns the NearestCellIndex of the maze's passable blocks, built the first time it is requested
+            and again whenever a block changes between a wall and a passable block. A SearchableMaze of the
+            maze shares its own index, see share_nearest_cells.
+        """
+        if self.__nearest_cells is None or self.__nearest_cells_version != self.passability_version:
+            from gridgraph import GridGraph # imported here, as gridgraph depends on Block
+            from nearestcell import NearestCellIndex
 
-        abs_mp = [abs_midpoint_rows, abs_midpoint_cols]
+            self.share_nearest_cells(NearestCellIndex(GridGraph(self.matrix)))
+        return self.__nearest_cells
 
-        if self.matrix[abs_mp[0]][abs_mp[1]] == Block.PATH:
-            return (abs_mp[1], abs_mp[0])
+    def graph_buffers(self):
+        """ Returns the (passable, neighbor_masks) buffers of the graph saved with the loaded maze, views
+            onto the memory-mapped file for binary mazes, or None if it was saved without one or walls have
+            changed since. SearchableMaze builds its graph over them with GridGraph.from_buffers.
+        """
+        if self.__graph_buffers_version != self.passability_version:
+            return None
+        return self.__graph_buffers
 
-        search_area_bounds = 1
-        found_path = False
-        while not found_path:
-            min_row = abs_mp[0] - search_area_bounds
-            max_row = abs_mp[0] + search_area_bounds
+    def share_nearest_cells(self, index):
+        """ Uses *index*, a NearestCellIndex over a graph of the maze's current blocks, for nearest_cells()
+            until passability next changes, instead of building another graph.
+        """
+        self.__nearest_cells = index
+        self.__nearest_cells_version = self.passability_version
 
-            min_col = abs_mp[1] - search_area_bounds
-            max_col = abs_mp[1] + search_area_bounds
+    def calculate_global_mp(self):
+        """ Calculates midpoint of maze: the passable block closest to its center, or None if there is none. """
 
-            for y in range(min_row, max_row):
-                for x in range(min_col, max_col):
-                    try:
-                        if self.matrix[y][x] == Block.PATH: return (x, y)
-                    except IndexError:
-                        break
+        width = len(self.matrix[0])
+        height = len(self.matrix)
 
-            search_area_bounds += 1
+        return self.nearest_cells().nearest((width // 2, height // 2))
+
+    def calculate_mp(self, start, end, allowed=None, reachable=False):
+        """ Calculates midpoint between two points: the passable block closest to halfway between them.
+
+            With *reachable*, only blocks reachable from both points are used, and None is returned if the
+            points are not connected. If given, *allowed* is called with candidate (x, y) blocks, and only
+            those it returns True for are used. Returns None if no block qualifies.
+        """
+        from nearestcell import midpoint
+
+        index = self.nearest_cells()
+
+        component = None
+        if reachable:
+            graph = index.graph
+            start_cell = graph.cell_id(start)
+            if not graph.connected(start_cell, graph.cell_id(end)):
+                return None
+            component = graph.components[start_cell]
+
+        return index.nearest(midpoint(start, end), component, allowed)
 
     def calculate_sl(self, start, end):
         """ Calculates straight line distance between two points. """
@@ -208,9 +309,54 @@ class Maze:
         y_offset = end[1] - start[1]
         return math.sqrt(x_offset**2 + y_offset**2)
         
+    def set_cost(self, pos, cost):
+        """ Sets the cost of entering the block at the (x, y) position *pos* to *cost*, a whole number from 1
+            to 255, as used by SearchableMaze.find_weighted_path. Every cost is 1 until one is set.
+        """
+        self.fill_cost(pos, pos, cost)
+
+    def fill_cost(self, from_pos, to_pos, cost):
+        """ Sets the cost of entering every block in the rectangle with corners *from_pos* and *to_pos*,
+            inclusive, such as a slow zone, to *cost*. See set_cost.
+        """
+        if cost != int(cost) or not 1 <= cost <= 255:
+            raise ValueError(f"Costs must be whole numbers from 1 to 255, not {cost!r}.")
+
+        columns = len(self.matrix[0]) if self.matrix else 0
+        if self.costs is None:
+            self.costs = bytearray(b"\x01") * (columns * len(self.matrix))
+
+        x_start, x_end = sorted((from_pos[0], to_pos[0]))
+        y_start, y_end = sorted((from_pos[1], to_pos[1]))
+        row = bytes([int(cost)]) * (x_end - x_start + 1)
+        for y in range(y_start, y_end + 1):
+            self.costs[y * columns + x_start:y * columns + x_end + 1] = row
+        self.version += 1
+
+    def lowest_cost(self):
+        """ Returns the lowest cost of entering any block, or 1 while every cost is 1. It is found once per
+            version of the maze, so costs should only be changed through set_cost and fill_cost.
+        """
+        if self.__lowest_cost_version != self.version:
+            self.__lowest_cost = min(self.costs) if self.costs else 1
+            self.__lowest_cost_version = self.version
+        return self.__lowest_cost
+
+    def cost(self, pos):
+        """ Returns the cost of entering the block at the (x, y) position *pos*. """
+        if self.costs is None: return 1
+        return self.costs[pos[1] * len(self.matrix[0]) + pos[0]]
+
     def draw_path(self, path, color):
+        walls_changed = False
         for pos in path:
-            self.matrix[pos[1]][pos[0]] = color
+            row = self.matrix[pos[1]]
+            if (row[pos[0]] == Block.WALL) != (color == Block.WALL):
+                walls_changed = True
+            row[pos[0]] = color
+        self.version += 1
+        if walls_changed:
+            self.passability_version += 1
 
     def __generate_matrix(self, width, height):
         """ Returns a nested list of the size specified by *width* and *height*.
@@ -218,7 +364,7 @@ class Maze:
         """
         return [[Block.WALL for col in range(0,height)] for row in range(0, width)]
 
-    def __generate_maze(self, matrix, start, end):
+    def __generate_maze(self, matrix, start, end, rng):
         """ Generates a randomized maze using the given matrix. 
             
             Parameters
@@ -227,6 +373,8 @@ class Maze:
                 the start position of the maze
             end: (int, int)
                 the end position of the maze
+            rng: random.Random
+                the source of randomness
         """
     
         position = start
@@ -260,10 +408,10 @@ class Maze:
                 if valid_move_iterations > 5: 
                     # If we've tried over 50 randomization attempts to find a valid direction,
                     # back-track a random number of elements and try again.
-                    new_position = random.choice(path_history)
+                    new_position = rng.choice(path_history)
 
                 # Randomly back-track to create a more varied maze.
-                if random.randint(0,3) == 0: new_position = random.choice(path_history)
+                if rng.randint(0,3) == 0: new_position = rng.choice(path_history)
                     
 
                 possible_directions = set([Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST])
@@ -279,7 +427,7 @@ class Maze:
 
                 # Once we have determines the available directions, select one at random.
                 possible_directions = list(possible_directions)
-                direction = random.choice(possible_directions)
+                direction = rng.choice(possible_directions)
 
                 # Now, increment or decrement the appropriate coordinate of new_position[].
                 if direction == Direction.NORTH:
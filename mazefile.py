@@ -0,0 +1,134 @@
+#
+# This module contains the binary maze file format used by Maze.save and Maze.load.
+#
+# A file is a 32 byte header followed by the cells of the maze, row after row:
+#
+#   magic       4s   b"AMAZ"
+#   version     H    FORMAT_VERSION
+#   encoding    H    ENCODING_BYTES (one Block value per byte) or ENCODING_BITS (one passability bit per cell)
+#   columns     I
+#   rows        I
+#   start       ii   (x, y) of the start, or (-1, -1) if unknown
+#   end         ii   (x, y) of the end, or (-1, -1) if unknown
+#
+# All fields are little-endian. In ENCODING_BITS, each row is padded to a whole number of bytes, and the
+# most significant bit of each byte is the leftmost cell.
+#
+# The cells may be followed by sections, each a 12 byte header followed by its data:
+#
+#   tag         4s   what the section holds, one of the SECTION_ tags
+#   length      Q    bytes of data that follow
+#
+# Readers skip sections they do not know, and a file without sections is laid out as before sections
+# existed, so older readers can still load any file.
+#
+#   SECTION_GRAPH  the GridGraph passable map followed by its neighbor masks, one byte per cell each
+#   SECTION_COSTS  the cost of entering each cell, one byte per cell, see Maze.set_cost
+#
+
+import mmap, struct
+from maze import Block
+
+MAGIC = b"AMAZ"
+FORMAT_VERSION = 1
+
+ENCODING_BYTES = 0
+ENCODING_BITS = 1
+
+HEADER = struct.Struct("<4sHHIIiiii")
+SECTION = struct.Struct("<4sQ")
+
+SECTION_GRAPH = b"GRPH"
+SECTION_COSTS = b"COST"
+
+# Translation tables between Block values and the ASCII digits used to pack rows into bits.
+PACK_TABLE = bytes(ord('0') if block == Block.WALL else ord('1') for block in range(256))
+UNPACK_TABLE = bytes(Block.PATH if byte == ord('1') else Block.WALL for byte in range(256))
+
+class MazeFileError(ValueError):
+    """ Raised when a file is not a maze file this version can read. """
+
+def is_maze_file(filename):
+    """ Returns True if *filename* starts with the binary maze file magic. """
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def write(filename, buffer, columns, rows, start=None, end=None, encoding=ENCODING_BYTES, sections=None):
+    """ Writes a one byte per cell maze *buffer* to *filename*, followed by *sections*, a dict of section
+        tag -> data.
+    """
+    start = tuple(start) if start is not None else (-1, -1)
+    end = tuple(end) if end is not None else (-1, -1)
+
+    with open(filename, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, encoding, columns, rows, *start, *end))
+
+        if encoding == ENCODING_BYTES:
+            file.write(buffer)
+        elif encoding == ENCODING_BITS:
+            padding = b'0' * (-columns % 8)
+            row_bytes = (columns + 7) // 8
+            for row in range(0, rows):
+                digits = bytes(buffer[row * columns:(row + 1) * columns]).translate(PACK_TABLE) + padding
+                file.write(int(digits, 2).to_bytes(row_bytes, 'big') if digits else b'')
+        else:
+            raise MazeFileError(f"Unknown maze file encoding {encoding!r}.")
+
+        for tag, data in (sections or {}).items():
+            file.write(SECTION.pack(tag, len(data)))
+            file.write(data)
+
+def read(filename):
+    """ Reads a maze file, returning (buffer, columns, rows, start, end, sections), where *sections* is a
+        dict of section tag -> data.
+
+        Files with one byte per cell are memory-mapped copy-on-write, and *buffer* and the section data
+        are views onto the map, so nothing is copied or parsed up front and writes to them never reach
+        the file. A file saved with its graph section can therefore be searched without copying a cell,
+        see Maze.save. Bit-packed files are unpacked into a new bytearray, and their sections are read.
+    """
+    with open(filename, 'rb') as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise MazeFileError(f"{filename} is too short to be a maze file.")
+
+        magic, version, encoding, columns, rows, start_x, start_y, end_x, end_y = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise MazeFileError(f"{filename} is not a maze file.")
+        if version > FORMAT_VERSION:
+            raise MazeFileError(f"{filename} uses maze file version {version}, newer than {FORMAT_VERSION}.")
+
+        start = (start_x, start_y) if start_x >= 0 else None
+        end = (end_x, end_y) if end_x >= 0 else None
+
+        if encoding == ENCODING_BYTES:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+            buffer = memoryview(mapping)[HEADER.size:HEADER.size + columns * rows]
+            rest = memoryview(mapping)[HEADER.size + columns * rows:]
+        elif encoding == ENCODING_BITS:
+            row_bytes = (columns + 7) // 8
+            buffer = bytearray()
+            for row in range(0, rows):
+                bits = int.from_bytes(file.read(row_bytes), 'big')
+                digits = bin(bits)[2:].zfill(row_bytes * 8)[:columns]
+                buffer += digits.encode('ascii').translate(UNPACK_TABLE)
+            rest = memoryview(bytearray(file.read()))
+        else:
+            raise MazeFileError(f"{filename} uses unknown maze file encoding {encoding}.")
+
+    if len(buffer) != columns * rows:
+        raise MazeFileError(f"{filename} is truncated.")
+
+    sections = {}
+    offset = 0
+    while offset < len(rest):
+        if offset + SECTION.size > len(rest):
+            raise MazeFileError(f"{filename} is truncated.")
+        tag, length = SECTION.unpack(rest[offset:offset + SECTION.size])
+        offset += SECTION.size
+        if offset + length > len(rest):
+            raise MazeFileError(f"{filename} is truncated.")
+        sections[tag] = rest[offset:offset + length]
+        offset += length
+
+    return (buffer, columns, rows, start, end, sections)
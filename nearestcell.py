@@ -0,0 +1,116 @@
+#
+# This module contains NearestCellIndex, which finds the passable cell of a GridGraph closest to any position, such as
+# the midpoint used by find_novel_path.
+#
+
+def midpoint(a_point, b_point):
+    """ Returns the (x, y) position halfway between two points, rounded down. """
+    return ((a_point[0] + b_point[0]) // 2, (a_point[1] + b_point[1]) // 2)
+
+class NearestCellIndex:
+    """NearestCellIndex
+        A grid bucket index over the passable cells of a GridGraph. The grid is divided into square buckets,
+        and a query scans rings of buckets outwards from the one holding the position, stopping as soon
+        as no unscanned bucket could hold a closer cell. In a maze, where most buckets hold passable cells,
+        this touches a constant number of buckets per query.
+
+        A bucket's cells are listed the first time it is scanned, so building the index costs nothing up
+        front, and invalidate() drops a bucket after its cells change.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph whose passable cells are indexed
+        bucket_size: int
+            the number of cells per side of a bucket
+    """
+    def __init__(self, graph, bucket_size=16):
+        self.graph = graph
+        self.bucket_size = bucket_size
+        self.bucket_columns = -(-graph.width // bucket_size)
+        self.bucket_rows = -(-graph.height // bucket_size)
+
+        self.buckets = {} # bucket index -> list of the passable cell ids in it
+
+    def bucket(self, bucket_x, bucket_y):
+        """ Returns the passable cell ids in a bucket, listing them the first time it is requested. """
+        index = bucket_y * self.bucket_columns + bucket_x
+        cells = self.buckets.get(index)
+        if cells is None:
+            cells = self.buckets[index] = self.__list_cells(bucket_x, bucket_y)
+        return cells
+
+    def __list_cells(self, bucket_x, bucket_y):
+        graph, size = self.graph, self.bucket_size
+        passable, width = graph.passable, graph.width
+
+        x_start = bucket_x * size
+        x_end = min(x_start + size, width)
+        y_start = bucket_y * size
+        y_end = min(y_start + size, graph.height)
+
+        cells = []
+        for y in range(y_start, y_end):
+            row_start, row_end = y * width + x_start, y * width + x_end
+            if isinstance(passable, bytearray):
+                cell = passable.find(1, row_start, row_end)
+                while cell != -1:
+                    cells.append(cell)
+                    cell = passable.find(1, cell + 1, row_end)
+            else:
+                cells.extend(cell for cell in range(row_start, row_end) if passable[cell])
+        return cells
+
+    def invalidate(self, cell):
+        """ Drops the bucket holding *cell*, after the cell has turned into a wall or an open cell. """
+        y, x = divmod(cell, self.graph.width)
+        self.buckets.pop((y // self.bucket_size) * self.bucket_columns + x // self.bucket_size, None)
+
+    def nearest(self, pos, component=None, allowed=None):
+        """ Returns the (x, y) position of the passable cell closest to *pos* in straight line distance, or
+            None if there is none. Ties go to the lowest cell id.
+
+            If *component* is given, only cells with that label in the graph's components are considered,
+            such as the cells reachable from a point. If *allowed* is given, it is called with the (x, y)
+            position of each candidate closer than the best found so far, and only those it returns True
+            for are considered.
+        """
+        graph, size = self.graph, self.bucket_size
+        width = graph.width
+        components = graph.components if component is not None else None
+
+        x = min(max(pos[0], 0), width - 1)
+        y = min(max(pos[1], 0), graph.height - 1)
+        query_x, query_y = x // size, y // size
+
+        best = None
+        best_key = None
+
+        last_ring = max(query_x, self.bucket_columns - 1 - query_x, query_y, self.bucket_rows - 1 - query_y)
+        for ring in range(0, last_ring + 1):
+            # A cell in this ring is at least this far away along one axis
+            if best_key is not None and best_key[0] < ((ring - 1) * size + 1) ** 2:
+                break
+
+            for bucket_y in range(max(query_y - ring, 0), min(query_y + ring, self.bucket_rows - 1) + 1):
+                if bucket_y in (query_y - ring, query_y + ring):
+                    bucket_xs = range(max(query_x - ring, 0), min(query_x + ring, self.bucket_columns - 1) + 1)
+                else:
+                    bucket_xs = [bx for bx in (query_x - ring, query_x + ring) if 0 <= bx < self.bucket_columns]
+
+                for bucket_x in bucket_xs:
+                    # Skip buckets that cannot hold anything closer than the best cell
+                    if best_key is not None:
+                        dx = max(bucket_x * size - x, 0, x - (bucket_x * size + size - 1))
+                        dy = max(bucket_y * size - y, 0, y - (bucket_y * size + size - 1))
+                        if dx * dx + dy * dy > best_key[0]: continue
+
+                    for cell in self.bucket(bucket_x, bucket_y):
+                        cell_y, cell_x = divmod(cell, width)
+                        key = ((cell_x - x) ** 2 + (cell_y - y) ** 2, cell)
+                        if best_key is not None and key >= best_key: continue
+                        if components is not None and components[cell] != component: continue
+                        if allowed is not None and not allowed((cell_x, cell_y)): continue
+                        best, best_key = (cell_x, cell_y), key
+
+        return best
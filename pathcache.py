@@ -0,0 +1,100 @@
+#
+# This module contains PathCache, the optional least recently used cache of search results kept by SearchableMaze.
+#
+
+import threading
+from collections import OrderedDict
+
+def copy_path(path, reverse=False):
+    """ Returns a copy of a path of [x, y] positions, turned around if *reverse*, so that cached paths are
+        never shared with callers. None is returned as is.
+    """
+    if path is None: return None
+    return [list(pos) for pos in (reversed(path) if reverse else path)]
+
+class PathCache:
+    """PathCache
+        Caches the results of searches by method, heuristic and endpoints, for one version of a maze at a
+        time. Looking up a result for a different maze version than the cached ones clears the cache, so
+        results are never served for a maze that has been edited since.
+
+        A search between the same endpoints in the opposite direction is also a hit, and is returned with
+        *reversed* set, for the caller to turn around, unless it is looked up as not *symmetric*.
+
+        Parameters
+        __________
+        capacity: int
+            the most results to keep
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.version = None
+
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.reverse_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, version, method, heuristic, from_point, to_point, symmetric=True):
+        """ Returns (result, reversed) for a search of *version* of the maze, or None if it is not cached.
+            Searches whose result depends on the direction, such as find_novel_path's, pass *symmetric*
+            False so that only the same ordered pair of endpoints is a hit.
+        """
+        key = (method, heuristic, tuple(from_point), tuple(to_point))
+        reverse_key = (method, heuristic, tuple(to_point), tuple(from_point))
+
+        with self.lock:
+            self.__check_version(version)
+
+            if key in self.results:
+                self.hits += 1
+                self.results.move_to_end(key)
+                return (self.results[key], False)
+
+            if symmetric and reverse_key in self.results:
+                self.hits += 1
+                self.reverse_hits += 1
+                self.results.move_to_end(reverse_key)
+                return (self.results[reverse_key], True)
+
+            self.misses += 1
+            return None
+
+    def store(self, version, method, heuristic, from_point, to_point, result):
+        """ Caches the *result* of a search of *version* of the maze, evicting the least recently used if full. """
+        key = (method, heuristic, tuple(from_point), tuple(to_point))
+
+        with self.lock:
+            self.__check_version(version)
+
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.capacity:
+                self.results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+    def __check_version(self, version):
+        if version != self.version:
+            if self.results:
+                self.results.clear()
+                self.invalidations += 1
+            self.version = version
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "reverse_hits": self.reverse_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "cached_results": len(self.results),
+            "capacity": self.capacity
+        }
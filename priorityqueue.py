@@ -1,58 +1,321 @@
 #
-# From https://www.geeksforgeeks.org/priority-queue-in-python/
-# A simple implementation of Priority Queue
-# using Queue.
+# This module contains PriorityQueue, an indexed binary min-heap used for the open and closed lists of a search.
 #
 
+def node_key(node):
+    """ Default key function: nodes are indexed by their position. """
+    return tuple(node.pos)
+
+def identity_key(item):
+    """ Key function for queues of hashable items, such as cell ids, that are their own key. """
+    return item
+
+def node_priority(node):
+    """ Default priority function: nodes are ordered by their f score. """
+    return node.f
+
 class PriorityQueue(object):
-    def __init__(self):
-        self.queue = []
+    """PriorityQueue
+        A binary min-heap with a key -> heap slot index, giving O(log n) insert, popMin and decreaseKey,
+        and O(1) membership checks. Only one item is stored per key; inserting an item whose key is
+        already queued keeps whichever of the two has the lower priority.
+
+        By default items are Nodes keyed by position and ordered by f, but any *key* and *priority*
+        functions can be supplied.
+
+        The queue counts its pushes, pops and decreased priorities, and its peak size, for SearchStats.
+    """
+    def __init__(self, key=node_key, priority=node_priority):
+        self.queue = []         # items, in heap order
+        self.priorities = []    # priority of each item in self.queue, captured on insert
+        self.index = {}         # key -> slot of the item in self.queue
+
+        self.key = key
+        self.priority = priority
+
+        # for statistics
+        self.pushes = 0
+        self.pops = 0
+        self.decreases = 0
+        self.peak_size = 0
 
     def __len__(self):
         return len(self.queue)
-    
+
     def __str__(self):
         return str(self.queue)
-  
+
+    def __contains__(self, item):
+        return self.key(item) in self.index
+
     # for checking if the queue is empty
     def isEmpty(self):
         return len(self.queue) == 0
-  
+
     # for inserting an element in the queue
-    def insert(self, node):
-        self.queue.append(node)
+    def insert(self, item):
+        """ Adds *item* to the queue, or lowers its priority if an item with the same key is queued. """
+        key = self.key(item)
+        slot = self.index.get(key)
+        if slot is not None:
+            priority = self.priority(item)
+            if priority < self.priorities[slot]:
+                self.decreases += 1
+                self.queue[slot] = item
+                self.priorities[slot] = priority
+                self.__sift_up(slot)
+            return
+
+        self.pushes += 1
+        self.queue.append(item)
+        self.priorities.append(self.priority(item))
+
+        slot = len(self.queue) - 1
+        if slot >= self.peak_size:
+            self.peak_size = slot + 1
+        self.index[key] = slot
+        self.__sift_up(slot)
+
+    def decreaseKey(self, item):
+        """ Re-reads the priority of a queued item after it has been lowered. """
+        self.decreases += 1
+        slot = self.index[self.key(item)]
+        self.queue[slot] = item
+        self.priorities[slot] = self.priority(item)
+        self.__sift_up(slot)
+
+    def remove(self, item):
+        """ Removes the queued item sharing *item*'s key. """
+        slot = self.index.pop(self.key(item))
+
+        last_item = self.queue.pop()
+        last_priority = self.priorities.pop()
+        if slot < len(self.queue):
+            self.queue[slot] = last_item
+            self.priorities[slot] = last_priority
+            self.index[self.key(last_item)] = slot
+            self.__sift_down(slot)
+            self.__sift_up(self.index[self.key(last_item)])
+
+    def reprioritize(self):
+        """ Re-reads the priority of every queued item, after the priority function's results have changed,
+            and restores the heap order in place.
+        """
+        priority = self.priority
+        self.priorities = [priority(item) for item in self.queue]
+        for slot in range(len(self.queue) // 2 - 1, -1, -1):
+            self.__sift_down(slot)
 
     def containsPosition(self, node):
-        nodes = []
-        for q_node in self.queue:
-            if q_node.pos == node.pos:
-                nodes.append(q_node)
-        
-        if len(nodes) < 1: return False
-
-        try:
-            min = 0
-            for i in range(len(nodes)):
-                if nodes[i].f < nodes[min].f:
-                    min = i
-            item = nodes[min]
-            del nodes[min]
-            return item
-        except IndexError:
-            print()
-            exit()
-  
+        """ Returns the queued item sharing *node*'s key, or False if there is none. """
+        slot = self.index.get(self.key(node))
+        if slot is None: return False
+        return self.queue[slot]
+
+    def peekMin(self):
+        """ Returns the item with the lowest priority without removing it. """
+        if not self.queue:
+            raise IndexError("peekMin from an empty PriorityQueue")
+        return self.queue[0]
+
+    def minPriority(self):
+        """ Returns the lowest priority in the queue, or infinity if the queue is empty. """
+        return self.priorities[0] if self.priorities else float('inf')
+
+    def popMin(self):
+        """ Removes and returns the item with the lowest priority. """
+        if not self.queue:
+            raise IndexError("popMin from an empty PriorityQueue")
+
+        self.pops += 1
+        item = self.queue[0]
+        del self.index[self.key(item)]
+
+        last_item = self.queue.pop()
+        last_priority = self.priorities.pop()
+        if self.queue:
+            self.queue[0] = last_item
+            self.priorities[0] = last_priority
+            self.index[self.key(last_item)] = 0
+            self.__sift_down(0)
+        return item
+
+    def __sift_up(self, slot):
+        queue, priorities, index, key = self.queue, self.priorities, self.index, self.key
+
+        item = queue[slot]
+        priority = priorities[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if priorities[parent] <= priority: break
+            queue[slot] = queue[parent]
+            priorities[slot] = priorities[parent]
+            index[key(queue[slot])] = slot
+            slot = parent
+
+        queue[slot] = item
+        priorities[slot] = priority
+        index[key(item)] = slot
+
+    def __sift_down(self, slot):
+        queue, priorities, index, key = self.queue, self.priorities, self.index, self.key
+
+        size = len(queue)
+        item = queue[slot]
+        priority = priorities[slot]
+        while True:
+            child = 2 * slot + 1
+            if child >= size: break
+            if child + 1 < size and priorities[child + 1] < priorities[child]:
+                child += 1
+            if priority <= priorities[child]: break
+            queue[slot] = queue[child]
+            priorities[slot] = priorities[child]
+            index[key(queue[slot])] = slot
+            slot = child
+
+        queue[slot] = item
+        priorities[slot] = priority
+        index[key(item)] = slot
+
+class BucketQueue(object):
+    """BucketQueue
+        A bucket queue (Dial, 1969) for small non-negative integer priorities, with the same interface as
+        PriorityQueue. Items are kept in one list per priority, and the lowest priority is found by stepping
+        a pointer upwards through the buckets, so insert, decreaseKey and popMin take O(1) amortized time
+        when priorities rise by small steps, as the f values of an A* search over small integer costs do.
+
+        Lowering an item's priority leaves its old entry behind, which is skipped when it is reached.
+        Items with equal priorities are popped last in, first out.
+
+        Priorities must be integers; the queue counts its operations like PriorityQueue.
+    """
+    def __init__(self, key=identity_key, priority=node_priority):
+        self.buckets = {}       # priority -> keys queued with that priority, including stale entries
+        self.priorities = {}    # key -> current priority of the queued item
+        self.items = {}         # key -> queued item
+        self.current = None     # no queued item has a lower priority than this
+
+        self.key = key
+        self.priority = priority
+
+        # for statistics
+        self.pushes = 0
+        self.pops = 0
+        self.decreases = 0
+        self.peak_size = 0
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def __str__(self):
+        return str(self.queue)
+
+    def __contains__(self, item):
+        return self.key(item) in self.priorities
+
+    @property
+    def queue(self):
+        """ The queued items, in no particular order. """
+        return list(self.items.values())
+
+    def isEmpty(self):
+        return len(self.priorities) == 0
+
+    def insert(self, item):
+        """ Adds *item* to the queue, or lowers its priority if an item with the same key is queued. """
+        key = self.key(item)
+        priority = self.priority(item)
+
+        existing = self.priorities.get(key)
+        if existing is not None:
+            if priority >= existing: return
+            self.decreases += 1
+        else:
+            self.pushes += 1
+            if len(self.priorities) >= self.peak_size:
+                self.peak_size = len(self.priorities) + 1
+
+        self.__push(key, item, priority)
+
+    def decreaseKey(self, item):
+        """ Re-reads the priority of a queued item after it has been lowered. """
+        self.decreases += 1
+        self.__push(self.key(item), item, self.priority(item))
+
+    def __push(self, key, item, priority):
+        self.priorities[key] = priority
+        self.items[key] = item
+
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            self.buckets[priority] = [key]
+        else:
+            bucket.append(key)
+
+        if self.current is None or priority < self.current:
+            self.current = priority
+
+    def remove(self, item):
+        """ Removes the queued item sharing *item*'s key. Its entry is dropped when its bucket is reached. """
+        key = self.key(item)
+        del self.priorities[key]
+        del self.items[key]
+        if not self.priorities:
+            self.buckets = {}
+            self.current = None
+
+    def reprioritize(self):
+        """ Re-reads the priority of every queued item, after the priority function's results have changed. """
+        items = list(self.items.values())
+        self.buckets = {}
+        self.priorities = {}
+        self.items = {}
+        self.current = None
+        for item in items:
+            self.__push(self.key(item), item, self.priority(item))
+
+    def __advance(self):
+        """ Moves self.current to the lowest queued priority, discarding stale entries on the way, and returns
+            the bucket holding the next item to pop.
+        """
+        buckets, priorities = self.buckets, self.priorities
+        current = self.current
+        while True:
+            bucket = buckets.get(current)
+            if bucket is not None:
+                while bucket:
+                    if priorities.get(bucket[-1]) == current:
+                        self.current = current
+                        return bucket
+                    bucket.pop()
+                del buckets[current]
+            current += 1
+
+    def peekMin(self):
+        """ Returns the item with the lowest priority without removing it. """
+        if not self.priorities:
+            raise IndexError("peekMin from an empty BucketQueue")
+        return self.items[self.__advance()[-1]]
+
+    def minPriority(self):
+        """ Returns the lowest priority in the queue, or infinity if the queue is empty. """
+        if not self.priorities: return float('inf')
+        self.__advance()
+        return self.current
+
     def popMin(self):
-        cumulative_g = 0
-        
-        try:
-            min = 0
-            for i in range(len(self.queue)):
-                if self.queue[i].f < self.queue[min].f:
-                    min = i
-            item = self.queue[min]
-            del self.queue[min]
-            return item
-        except IndexError:
-            print()
-            exit()
\ No newline at end of file
+        """ Removes and returns the item with the lowest priority. """
+        if not self.priorities:
+            raise IndexError("popMin from an empty BucketQueue")
+
+        self.pops += 1
+        key = self.__advance().pop()
+        del self.priorities[key]
+        item = self.items.pop(key)
+
+        if not self.priorities:
+            # Forget the old minimum, so that the next insert does not have to step up from it
+            self.buckets = {}
+            self.current = None
+        return item
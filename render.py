@@ -0,0 +1,160 @@
+#
+# This module contains the maze renderers: ANSI colored text streamed to a file object, optionally downsampled to fit
+# the terminal, and PPM and PNG images written row by row from the maze's cells. Maze.print and Maze.save_image use it.
+#
+
+import re, shutil, struct, sys, zlib
+from maze import Block
+
+CHARACTER = "■"
+RESET = "\x1b[0m"
+
+# The SGR sequence starting each run of a block type. Each one resets first, so no colors carry over.
+ANSI_STYLES = {
+    Block.WALL: "\x1b[0;30;40m",
+    Block.PATH: "\x1b[0;37;47m",
+    Block.GOAL: "\x1b[0;37m",
+    Block.HIGHLIGHT_1: "\x1b[0;36m",
+    Block.HIGHLIGHT_2: "\x1b[0;34;44m",
+    Block.HIGHLIGHT_3: "\x1b[0;35;45m",
+}
+
+PALETTE = {
+    Block.WALL: (0, 0, 0),
+    Block.PATH: (255, 255, 255),
+    Block.GOAL: (230, 190, 0),
+    Block.HIGHLIGHT_1: (0, 205, 205),
+    Block.HIGHLIGHT_2: (0, 0, 238),
+    Block.HIGHLIGHT_3: (205, 0, 205),
+}
+UNKNOWN_COLOR = (128, 128, 128)
+
+# One byte translation table per color channel, mapping a block value to its intensity
+CHANNEL_TABLES = [
+    bytes(PALETTE.get(value, UNKNOWN_COLOR)[channel] for value in range(256)) for channel in range(3)
+]
+
+# When downsampling, every block type is given a bit, and the bits of all cells merged into one are ORed
+# together. The merged cell takes the block type of the highest set bit, so highlights and goals stay
+# visible over paths, and paths over walls.
+MERGE_ORDER = (Block.PATH, Block.GOAL, Block.HIGHLIGHT_1, Block.HIGHLIGHT_2, Block.HIGHLIGHT_3)
+TO_MERGE_BITS = bytes((1 << MERGE_ORDER.index(value)) if value in MERGE_ORDER else 0 for value in range(256))
+FROM_MERGE_BITS = bytes(
+    MERGE_ORDER[min(bits.bit_length(), len(MERGE_ORDER)) - 1] if bits else Block.WALL for bits in range(256)
+)
+
+RUN = re.compile(rb"(.)\1*", re.S)
+
+def row_bytes(row):
+    """ Returns a row of a maze matrix, a list of blocks or a view onto the maze's buffer, as bytes. """
+    return row if isinstance(row, bytes) else bytes(row)
+
+def write_ansi(matrix, file=None, factor=1):
+    """ Writes *matrix* to *file* (stdout by default) as colored text, one row at a time. Each run of cells
+        of the same block type is a single escape sequence and a repeated character, rather than escape
+        codes per cell. With a *factor* above 1 the maze is first downsampled, see downsample().
+    """
+    file = sys.stdout if file is None else file
+    rows = downsample(matrix, factor) if factor > 1 else matrix
+
+    for row in rows:
+        row = row_bytes(row)
+        parts = []
+        for run in RUN.finditer(row):
+            parts.append(ANSI_STYLES.get(row[run.start()], RESET))
+            parts.append(CHARACTER * (run.end() - run.start()))
+        parts.append(RESET + "\n")
+        file.write("".join(parts))
+
+def fit_factor(matrix, size=None):
+    """ Returns the smallest downsampling factor at which *matrix* fits in *size*, an os.terminal_size or a
+        (columns, lines) tuple, which is the size of the terminal by default. A line is kept for the prompt.
+    """
+    columns, lines = shutil.get_terminal_size() if size is None else size
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    return max(1, -(-cols // max(1, columns)), -(-rows // max(1, lines - 1)))
+
+def downsample(matrix, factor):
+    """ Shrinks *matrix* by *factor* in both directions, merging every *factor* x *factor* square of cells
+        into one. The merged cell is a highlight if any of its cells is, then a goal, then a path, and
+        otherwise a wall. Returns a list of bytes rows.
+    """
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    out_cols = -(-cols // factor)
+    padding = bytes(out_cols * factor - cols)
+
+    result = []
+    for band in range(0, rows, factor):
+        merged = 0
+        for row in matrix[band:band + factor]:
+            bits = row_bytes(row).translate(TO_MERGE_BITS) + padding
+            for offset in range(0, factor):
+                merged |= int.from_bytes(bits[offset::factor], 'big')
+        result.append(merged.to_bytes(out_cols, 'big').translate(FROM_MERGE_BITS))
+    return result
+
+def rgb_rows(matrix, scale=1):
+    """ Yields the pixel rows of *matrix* as RGB bytes, with every cell *scale* x *scale* pixels. """
+    for row in matrix:
+        row = row_bytes(row)
+        pixels = bytearray(3 * len(row) * scale)
+        for channel, table in enumerate(CHANNEL_TABLES):
+            values = row.translate(table)
+            for offset in range(0, scale):
+                pixels[3 * offset + channel::3 * scale] = values
+        for _ in range(0, scale):
+            yield pixels
+
+def write_ppm(matrix, file, scale=1):
+    """ Writes *matrix* to the binary *file* as a PPM (P6) image with *scale* pixels per cell. """
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    file.write(b"P6\n%d %d\n255\n" % (cols * scale, rows * scale))
+    for pixels in rgb_rows(matrix, scale):
+        file.write(pixels)
+
+def write_png(matrix, file, scale=1, chunk_size=1 << 16):
+    """ Writes *matrix* to the binary *file* as an 8-bit RGB PNG image with *scale* pixels per cell. The
+        pixels are compressed as they are generated and written in IDAT chunks of about *chunk_size* bytes.
+    """
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+
+    def write_chunk(kind, data):
+        file.write(struct.pack(">I", len(data)))
+        file.write(kind)
+        file.write(data)
+        file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    file.write(b"\x89PNG\r\n\x1a\n")
+    write_chunk(b"IHDR", struct.pack(">IIBBBBB", cols * scale, rows * scale, 8, 2, 0, 0, 0))
+
+    compressor = zlib.compressobj()
+    pending = []
+    pending_size = 0
+    for pixels in rgb_rows(matrix, scale):
+        # Each scanline starts with its filter type, 0 for none
+        data = compressor.compress(b"\x00" + pixels)
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= chunk_size:
+            write_chunk(b"IDAT", b"".join(pending))
+            pending = []
+            pending_size = 0
+
+    pending.append(compressor.flush())
+    write_chunk(b"IDAT", b"".join(pending))
+    write_chunk(b"IEND", b"")
+
+def save_image(matrix, filename, scale=1):
+    """ Saves *matrix* as an image with *scale* pixels per cell, as a PNG if *filename* ends in .png and a PPM
+        otherwise.
+    """
+    with open(filename, "wb") as file:
+        if filename.lower().endswith(".png"):
+            write_png(matrix, file, scale)
+        else:
+            write_ppm(matrix, file, scale)
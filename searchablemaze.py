@@ -1,250 +1,841 @@
 #
-# This module contains SearchableMaze, a class which converts a Maze into a matrix of nodes that can be traversed with a search algorithm more easily.
+# This module contains SearchableMaze, a class which converts a Maze into a compact graph that can be traversed with a search algorithm more easily.
 #
 
 from operator import itemgetter
 from maze import Block
-from priorityqueue import PriorityQueue
-import threading, random, time
+from gridgraph import GridGraph, Node
+from searchcontext import SearchContext
+from heuristics import cell_heuristic, get_heuristic, min_heuristic, integer_heuristic
+from jps import JumpDistances, JumpPointContext
+from junctiongraph import JunctionGraph
+from hpa import ClusterGraph
+from landmarks import Landmarks, LANDMARKS
+from bitboard import Bitboard
+from dstarlite import DStarLite
+from pathcache import PathCache, copy_path
+from anytime import AnytimeContext
+from weighted import WeightedContext, lowest_cost
+from searchstats import SearchResult, SearchStats
+from nearestcell import NearestCellIndex, midpoint
+import threading, random, time, weakref
 
-class Node:
+class SearchableMaze:
+    """SearchableMaze
+        Wraps a Maze in a compact graph and provides search algorithms over it.
+
+        Parameters
+        __________
+        maze: Maze or TiledMaze
+            the maze to search
+        heuristic: str or function
+            the default heuristic for searches: "euclidean", "manhattan", "landmarks", or a function taking
+            a cell position and the goal position, see heuristics.get_heuristic
+        cache_size: int
+            if given, the results of find_path and find_novel_path are kept in a PathCache of this many
+            entries, readable as self.path_cache, and discarded whenever the maze's version changes
+        on_expand: function
+            if given, called as on_expand(context, cell) each time a search expands a cell, with the
+            SearchContext of the search and the cell's id, for tracing or sampling. It may be set at any time.
+    """
+    def __init__(self, maze, heuristic="euclidean", cache_size=None, on_expand=None):
+        self.maze = maze
+        self.path_cache = PathCache(cache_size) if cache_size else None
+        self.on_expand = on_expand
+
+        # Mazes that page their cells in on demand, such as TiledMaze, provide their own graph, and mazes
+        # loaded with a saved graph are searched on its buffers rather than a copy of their cells.
+        self.graph = getattr(maze, 'graph', None)
+        if self.graph is None:
+            buffers = maze.graph_buffers() if hasattr(maze, 'graph_buffers') else None
+            if buffers is not None:
+                self.graph = GridGraph.from_buffers(len(maze.matrix[0]), len(maze.matrix), *buffers)
+            else:
+                self.graph = GridGraph(maze.matrix)
+        self.heuristic = heuristic if heuristic == LANDMARKS else get_heuristic(heuristic)
+        self.__node_matrix = None
+        self.__jump_distances = None
+        self.__junction_graph = None
+        self.__cluster_graph = None
+        self.__landmarks = None
+        self.__bitboard = None
+        self.__nearest_cells = None
+
+        # Planners to tell about cells changed by set_cell
+        self.__replanners = weakref.WeakSet()
+
+        # The maze's own midpoint calculations use this graph too, rather than building another one
+        if hasattr(maze, 'share_nearest_cells'):
+            maze.share_nearest_cells(self.nearest_cells)
+
+    @property
+    def node_matrix(self):
+        """ A matrix of Nodes for every cell, built from the compact graph the first time it is requested. """
+        if self.__node_matrix is None:
+            self.__node_matrix = [
+                [self.graph.node((x, y)) for x in range(0, self.graph.width)]
+                for y in range(0, self.graph.height)
+            ]
+        return self.__node_matrix
+
+    @property
+    def jump_distances(self):
+        """ The JPS+ jump distance tables of the maze, computed the first time they are requested. """
+        if self.__jump_distances is None:
+            self.__jump_distances = JumpDistances(self.graph)
+        return self.__jump_distances
+
+    @property
+    def junction_graph(self):
+        """ The corridor-contracted JunctionGraph of the maze, computed the first time it is requested. """
+        if self.__junction_graph is None:
+            self.__junction_graph = JunctionGraph(self.graph)
+        return self.__junction_graph
+
+    @property
+    def cluster_graph(self):
+        """ The HPA* ClusterGraph of the maze, computed with the default cluster size the first time it
+            is requested, unless preprocess_clusters() has been called.
+        """
+        if self.__cluster_graph is None:
+            self.__cluster_graph = ClusterGraph(self.graph)
+        return self.__cluster_graph
+
+    def preprocess_clusters(self, cluster_size=16):
+        """ Builds the HPA* ClusterGraph of the maze with clusters of *cluster_size* cells per side. """
+        self.__cluster_graph = ClusterGraph(self.graph, cluster_size)
+        return self.__cluster_graph
+
+    @property
+    def landmarks(self):
+        """ The ALT Landmarks of the maze, placed with the default settings the first time they are
+            requested, unless preprocess_landmarks() has been called.
+        """
+        if self.__landmarks is None:
+            self.__landmarks = Landmarks(self.graph)
+        return self.__landmarks
+
+    @landmarks.setter
+    def landmarks(self, landmarks):
+        # Used by batch queries to install the caller's landmarks in each worker
+        self.__landmarks = landmarks
+
+    def preprocess_landmarks(self, count=8, selection="farthest", seed=None):
+        """ Places *count* landmarks and stores their distance arrays, for use by the "landmarks" heuristic.
+            See Landmarks for the *selection* strategies.
+        """
+        self.__landmarks = Landmarks(self.graph, count, selection, seed)
+        return self.__landmarks
+
+    @property
+    def bitboard(self):
+        """ The maze packed into one integer per row, built the first time it is requested. """
+        if self.__bitboard is None:
+            self.__bitboard = Bitboard(self.graph)
+        return self.__bitboard
+
+    @property
+    def nearest_cells(self):
+        """ The NearestCellIndex of the maze's passable cells, whose buckets are listed as they are first used. """
+        if self.__nearest_cells is None:
+            self.__nearest_cells = NearestCellIndex(self.graph)
+        return self.__nearest_cells
+
+    def maze_version(self):
+        """ Returns the version of the maze, which changes whenever its cells do. """
+        return getattr(self.maze, 'version', 0)
+
+    def set_cell(self, pos, block):
+        """ Changes the block at the (x, y) position *pos* of the maze, such as a door opening or an obstacle
+            appearing, and updates the graph around it without rebuilding it.
+
+            The HPA* clusters, bitboard and nearest cell index are patched in place. Other preprocessing that depends on the
+            whole maze (JPS+ tables, junction graph, landmarks) is discarded and rebuilt when next needed,
+            and every replanner of the maze is told about the change.
+
+            Raises NotImplementedError for mazes without an in-memory matrix, such as TiledMaze, which are
+            read-only.
+        """
+        if not hasattr(self.maze, 'matrix'):
+            raise NotImplementedError(f"{type(self.maze).__name__} is read-only; cells can only be changed in a Maze.")
+
+        self.maze.matrix[pos[1]][pos[0]] = block
+        self.maze.version += 1
+
+        cell = self.graph.cell_id(pos)
+        if not self.graph.set_passable(cell, block != Block.WALL):
+            return
+        self.maze.passability_version += 1
+
+        self.__jump_distances = None
+        self.__junction_graph = None
+        self.__landmarks = None
+
+        if self.__cluster_graph is not None:
+            self.__cluster_graph.rebuild_cluster(self.__cluster_graph.cluster_of(cell))
+        if self.__bitboard is not None:
+            self.__bitboard.set_passable(pos, block != Block.WALL)
+        if self.__nearest_cells is not None:
+            self.__nearest_cells.invalidate(cell)
+            self.maze.share_nearest_cells(self.__nearest_cells)
+
+        for replanner in self.__replanners:
+            replanner.cells_changed([cell])
+
+    def replanner(self, from_point, to_point, heuristic=None):
+        """ Returns a DStarLite planner between two points, which set_cell keeps informed of changes so that
+            each call to its plan() only repairs the part of the last path affected by them.
+            The landmark heuristic cannot be used, as it is invalidated by changes; manhattan is used instead.
+        """
+        heuristic = self.heuristic if heuristic is None else heuristic
+        if heuristic == LANDMARKS:
+            heuristic = "manhattan"
+
+        replanner = DStarLite(self.graph, from_point, to_point, heuristic)
+        self.__replanners.add(replanner)
+        return replanner
+
+    def cell_heuristic(self, to_point, heuristic=None):
+        """ Returns a function giving the heuristic value of a cell id towards *to_point*, computed on demand. """
+        heuristic = self.heuristic if heuristic is None else heuristic
+
+        # The landmark bound is combined with manhattan distance, which is tighter near the goal.
+        if heuristic == LANDMARKS:
+            manhattan = cell_heuristic(self.graph, "manhattan", to_point)
+            return self.landmarks.cell_heuristic(self.graph.cell_id(to_point), manhattan)
+
+        return cell_heuristic(self.graph, heuristic, to_point)
+
+    def is_reachable(self, from_point, to_point):
+        """ Returns True if both points are passable and in the same connected component. This is an O(1)
+            check once the graph's components have been labelled.
+        """
+        return self.graph.connected(self.graph.cell_id(from_point), self.graph.cell_id(to_point))
+
+    def shortest_distance(self, from_point, to_point):
+        """ Returns the number of steps on a shortest path between two points, or None if they are not
+            connected. Only the length is computed, with bit-parallel breadth first search, so no path is built.
+        """
+        return self.bitboard.distance(from_point, to_point)
+
+    def cells_within(self, point, steps):
+        """ Returns the cells at most *steps* steps from *point*, as one integer per row with bit x of row
+            y set for cell (x, y). Use bitboard.positions to list them.
+        """
+        return self.bitboard.within(point, steps)
+
+    def find_paths(self, queries, method="find_path", heuristic=None, processes=None, chunk_size=64):
+        """ Runs a search for every (from_point, to_point) pair in *queries*, spread over *processes* worker
+            processes (all cores by default, or the calling process alone if 1).
+
+            The graph and its component labels are copied once into shared memory, which every worker
+            attaches to, so no graph is pickled per query. Queries are sent in chunks of *chunk_size*.
+            With the "landmarks" heuristic, this maze's landmarks, including any placed by
+            preprocess_landmarks(), are shared the same way. Other preprocessing is built by each worker
+            the first time it needs it, so the throughput of find_jps_path with JPS+,
+            find_contracted_path and find_hierarchical_path includes one table, junction graph or cluster
+            build per worker.
+
+            Worker processes need the graph's component labels, so a TiledMaze can only be searched with
+            processes=1, and a callable heuristic must be a module-level function that can be pickled;
+            both raise ValueError when find_paths is called.
+
+            This returns a generator yielding one result dict per query as soon as its chunk finishes, so results
+            may arrive out of order. Each has the same keys as find_bidirectional_path's, "paths", "found",
+            "iterations", "duration" and "stats", plus "index", the query's position in *queries*, and "from"
+            and "to".
+
+            Parameters
+            __________
+            method: str
+                the search to run, one of batch.BATCH_METHODS
+        """
+        import batch # imported here, as batch depends on SearchableMaze
+        return batch.find_paths(self, queries, method, heuristic, processes, chunk_size)
+
+    def find_bidirectional_path(self, a_point, b_point, heuristic=None, max_iterations=None):
+        """ Finds the shortest path between two points with bidirectional A* search.
+
+            Both directions search the shared graph through their own context, always expanding the side
+            with the smaller open list. Whenever a cell has been reached from both sides, the cost of the
+            path through it is a candidate for the best meeting cost, mu. The search stops once the lowest
+            f on either open list is at least mu, as no unexpanded cell can then lie on a shorter path.
+            This is exact for consistent heuristics, such as euclidean and manhattan.
+
+            The single joined path is returned in "paths", ordered from *b_point* back to *a_point* like
+            find_path. "found" is False and "paths" is empty if the points are not connected.
+
+            If *max_iterations* is given and runs out first, the best path found so far is returned, and
+            "optimal" is False. "stats" holds the SearchStats of both directions together.
+        """
+
+        a_cell = self.graph.cell_id(a_point)
+        b_cell = self.graph.cell_id(b_point)
 
-    def __init__(self, pos=[-1,-1], block=Block.PATH):
-        self.pos = pos[:]
+        timing_start = time.perf_counter() # for statistics
+        stats = SearchStats()
+
+        if not self.graph.connected(a_cell, b_cell):
+            stats.lap("graph")
+            return {
+                "paths": [],
+                "found": False,
+                "optimal": True,
+                "iterations": 0,
+                "duration": time.perf_counter() - timing_start,
+                "stats": stats
+            }
+        stats.lap("graph")
+
+        a_context = SearchContext(self.graph, a_cell, self.cell_heuristic(b_point, heuristic))
+        b_context = SearchContext(self.graph, b_cell, self.cell_heuristic(a_point, heuristic))
+        stats.lap("heuristic")
+
+        on_expand = self.on_expand
+
+        # The cost of the best path found so far, and the cell at which its two halves meet
+        mu = 0 if a_cell == b_cell else float('inf')
+        meeting_cell = a_cell if a_cell == b_cell else -1
 
-        # self.label = ','.join(str(v) for v in label)
-        self.neighbors = []
-        self.block = Block.PATH
+        iterations = 0
+        optimal = True
 
-        self.h = float('inf')
-        self.g = 1
-        self.f = 0
+        while a_context.open_nodes and b_context.open_nodes:
+            if max(a_context.open_nodes.minPriority(), b_context.open_nodes.minPriority()) >= mu:
+                break
+            if max_iterations is not None and iterations >= max_iterations:
+                optimal = False
+                break
 
-        self.parent = None
+            if len(a_context.open_nodes) <= len(b_context.open_nodes):
+                context, ext_context = a_context, b_context
+            else:
+                context, ext_context = b_context, a_context
 
-    def print_path(self):
-        if self.parent:
-            return f"{self.pos} -> {self.parent.print_path()}"
+            iterations += 1
 
-    def get_path(self):
-        """ Returns an array representing the path to this node. """
-        path = [self.pos]
-        temp = self.parent
-        while temp != None:
-            path.append(temp.pos)
-            temp = temp.parent
-        
-        return path
+            q = context.pop()
+            if on_expand is not None: on_expand(context, q)
 
-class SearchableMaze:
-    def __init__(self, maze):
-        self.maze = maze
-        self.node_matrix = self.generate_node_matrix(maze.matrix)
-        
+            for neighbor in context.relax(q):
+                ext_g = ext_context.g.get(neighbor)
+                if ext_g is not None and context.g[neighbor] + ext_g < mu:
+                    mu = context.g[neighbor] + ext_g
+                    meeting_cell = neighbor
+        stats.lap("search")
 
-    def generate_node_matrix(self, matrix):
-        node_matrix = []
+        paths = []
+        if meeting_cell != -1:
+            a_half = a_context.get_path(meeting_cell)
+            b_half = b_context.get_path(meeting_cell)
+            paths.append(b_half[::-1] + a_half[1:])
+        stats.lap("path")
 
-        # Generate nodes
-        for y in range(0, len(matrix)):
-            node_row = []
-            for x in range(0, len(matrix[y])):
-                block_type = matrix[y][x]
-                node_row.append(Node([x, y], block_type))
-            node_matrix.append(node_row)
+        stats.expanded += iterations
+        stats.record(a_context)
+        stats.record(b_context)
 
-        # Calculate and store neighbors for all nodes
-        for row in node_matrix:
-            for node in row:
-                node.neighbors = self.calculate_neighbors(node_matrix, node)
-                # print(node.pos, [node.pos for node in node.neighbors])
+        timing_end = time.perf_counter() # for statistics
 
-        return node_matrix[:]    
+        return {
+            "paths": paths,
+            "found": bool(paths),
+            "optimal": optimal,
+            "iterations": iterations,
+            "duration": timing_end - timing_start,
+            "stats": stats
+        }
 
-    def calculate_sl_distances(self, to_point):
-        """ Calculates the straight line distances of each node in the matrix to the point specified. """
-        for y in range(0, len(self.node_matrix)):
-            for x in range(0, len(self.node_matrix[y])):
-                distance = self.maze.calculate_sl_dist((x, y), to_point)
-                self.node_matrix[y][x].h = round(distance,2)
+    def find_novel_path(self, from_point, to_point, heuristic=None):
+        """ Uses our approach to bi-directional A* search to find the shortest path passing through the midpoint.
+            Both halves come from one search outward from the midpoint, see find_paths_from.
+            "found" is False and "paths" is empty if the points are not connected.
 
-    def calculate_neighbors(self, node_matrix, node):
-        node_x = node.pos[0]
-        node_y = node.pos[1]
+            On a TiledMaze, whose components are not labelled, the midpoint is the passable cell closest to
+            halfway, and "found" is False if no path joins it to both points.
 
-        neighbors = []
-        if (node_x + 1) < len(node_matrix[0]):
-            if self.maze.matrix[node_y][node_x + 1] != Block.WALL:
-                neighbors.append(node_matrix[node_y][node_x + 1])
-        if (node_x - 1) >= 0:
-            if self.maze.matrix[node_y][node_x - 1] != Block.WALL:
-                neighbors.append(node_matrix[node_y][node_x - 1])
+            With a path cache, a cached search from the same point to the same point is returned with the
+            "iterations" and a copy of the "stats" of the search that found it, marked "cached". The search
+            in the opposite direction is not a hit, as its midpoint, rounded down, can be a different cell.
+        """
+        if self.path_cache is None:
+            return self.__find_novel_path(from_point, to_point, heuristic)
 
-        if (node_y + 1) < len(node_matrix):
-            if self.maze.matrix[node_y + 1][node_x] != Block.WALL:
-                neighbors.append(node_matrix[node_y + 1][node_x])
-        if (node_y - 1) >= 0:
-            if self.maze.matrix[node_y - 1][node_x] != Block.WALL:
-                neighbors.append(node_matrix[node_y - 1][node_x])
+        timing_start = time.perf_counter() # for statistics
 
-        return neighbors
+        version = self.maze_version()
+        hit = self.path_cache.lookup(version, "find_novel_path", heuristic, from_point, to_point, symmetric=False)
+        if hit is not None:
+            result = hit[0]
+            stats = result["stats"].copy()
+            stats.cached = True
+            return {
+                "paths": [copy_path(path) for path in result["paths"]],
+                "found": result["found"],
+                "iterations": result["iterations"],
+                "duration": time.perf_counter() - timing_start,
+                "stats": stats
+            }
+
+        result = self.__find_novel_path(from_point, to_point, heuristic)
+        self.path_cache.store(version, "find_novel_path", heuristic, from_point, to_point, {
+            "paths": [copy_path(path) for path in result["paths"]],
+            "found": result["found"],
+            "iterations": result["iterations"],
+            "stats": result["stats"].copy()
+        })
+        return result
+
+    def __find_novel_path(self, from_point, to_point, heuristic):
+        """ Runs find_novel_path's searches, without the cache. """
 
-    def find_bidirectional_path(self, a_point, b_point):
+        total_iterations = 0 # for statistics
 
-        a_matrix = self.generate_node_matrix(self.maze.matrix)
-        b_matrix = self.generate_node_matrix(self.maze.matrix)
+        timing_start = time.perf_counter() # for statistics
+        stats = SearchStats()
+
+        if not self.is_reachable(from_point, to_point):
+            stats.lap("graph")
+            return {
+                "paths": [],
+                "found": False,
+                "iterations": 0,
+                "duration": time.perf_counter() - timing_start,
+                "stats": stats
+            }
+        stats.lap("graph")
+
+        # The passable cell closest to halfway, of those reachable from the endpoints. Graphs without
+        # component labels, such as TiledGraph, take the closest passable cell, which may not be reachable.
+        component = self.graph.components[self.graph.cell_id(from_point)] if self.graph.has_components else None
+        mp = self.nearest_cells.nearest(midpoint(from_point, to_point), component)
+        if mp is None:
+            mp = from_point
+        stats.lap("midpoint")
+
+        # Calculate the paths from the midpoint to the start and to the goal with a single search
+        paths = [None, None]
+        for index, path, iterations in self.find_paths_from(mp, [from_point, to_point], heuristic, stats):
+            paths[index] = path
+            total_iterations = max(total_iterations, iterations)
+        path_to_start, path_to_goal = paths
 
-        a_node = a_matrix[a_point[1]][a_point[0]]
-        b_node = b_matrix[b_point[1]][b_point[0]]
+        timing_end = time.perf_counter() # for statistics
 
-        a_open_nodes = PriorityQueue()
-        a_open_nodes.insert(a_node)
+        return {
+            "paths": [path_to_start, path_to_goal],
+            "found": path_to_start is not None and path_to_goal is not None,
+            "iterations": total_iterations,
+            "duration": timing_end - timing_start,
+            "stats": stats
+        }
 
-        b_open_nodes = PriorityQueue()
-        b_open_nodes.insert(b_node)
+    def find_paths_from(self, from_point, to_points, heuristic=None, stats=None):
+        """ Finds the shortest path from one point to each of several goals with a single A* search, which
+            shares its open and closed sets between the goals instead of expanding the same cells once per goal.
+
+            The heuristic of a cell is the smallest of its heuristic values towards the goals not yet reached,
+            which stays admissible for all of them. Each time a goal is reached it is dropped and the open
+            list is reordered by the now larger estimates.
+
+            This is a generator yielding (index, path, iterations) for each goal, where index is the goal's
+            position in *to_points*, path is ordered from the goal back to *from_point* like find_path's and
+            is None if the goal cannot be reached, and iterations is the number taken so far. Goals are
+            yielded as they are reached, so the nearest tend to come first.
+
+            If a SearchStats is given as *stats*, the search's counts are added to it once it finishes or
+            the generator is closed.
+        """
+        graph = self.graph
+        from_cell = graph.cell_id(from_point)
+
+        if stats is None:
+            stats = SearchStats()
+        stats.start()
+
+        # Goals that cannot be reached are reported without searching
+        goals = {}
+        for index, to_point in enumerate(to_points):
+            to_cell = graph.cell_id(to_point)
+            if graph.connected(from_cell, to_cell):
+                goals.setdefault(to_cell, []).append(index)
+            else:
+                yield (index, None, 0)
+        stats.lap("graph")
 
-        a_closed_nodes = PriorityQueue()
-        b_closed_nodes = PriorityQueue()
+        if not goals: return
 
+        goal_heuristics = {cell: self.cell_heuristic(graph.position(cell), heuristic) for cell in goals}
+        context = SearchContext(graph, from_cell, min_heuristic(goal_heuristics.values()))
+        stats.lap("heuristic")
 
+        on_expand = self.on_expand
         iterations = 0
-        path = False
 
+        try:
+            while len(context.open_nodes) > 0:
+                iterations += 1
+
+                q = context.pop()
+                if on_expand is not None: on_expand(context, q)
+
+                if q in goals:
+                    stats.lap("search")
+                    path = context.get_path(q)
+                    stats.lap("path")
+
+                    for index in goals.pop(q):
+                        yield (index, list(path), iterations)
+
+                    if not goals: return
+
+                    del goal_heuristics[q]
+                    context.reset_heuristic(min_heuristic(goal_heuristics.values()))
+
+                context.relax(q)
+            stats.lap("search")
+
+            for cell, indices in goals.items():
+                for index in indices:
+                    yield (index, None, iterations)
+        finally:
+            stats.expanded += iterations
+            stats.record(context)
+
+    def find_path(self, from_point, to_point, heuristic=None, max_iterations=None, stats=None):
+        """ Finds the shortest path between two points with A* search over the compact graph.
+            *heuristic* overrides the maze's default heuristic for this search, and *max_iterations*, if
+            given, stops it after that many expansions. See find_anytime_path for a search that returns
+            the best path it has found when it runs out of time.
+
+            Returns a SearchResult, which unpacks as a tuple of the path, ordered from *to_point* back to
+            *from_point*, and the number of iterations taken, and holds the search's SearchStats as
+            "stats". The path is None if no path was found, and is returned without searching if the
+            points are not connected.
+
+            With a path cache, a cached search between the same points in either direction is returned,
+            turned around if needed, with the iterations and a copy of the stats of the search that found
+            it, marked "cached". Searches limited by *max_iterations* are not cached.
+
+            If a SearchStats is given as *stats*, the search's counts and phase timings are also added to
+            it, to total them over several searches. Cache hits add nothing, as no search is run.
+        """
+        if self.path_cache is None or max_iterations is not None:
+            return self.__find_path(from_point, to_point, heuristic, max_iterations, stats)
+
+        version = self.maze_version()
+        hit = self.path_cache.lookup(version, "find_path", heuristic, from_point, to_point)
+        if hit is not None:
+            (path, iterations, search_stats), reverse = hit
+            search_stats = search_stats.copy()
+            search_stats.cached = True
+            return SearchResult(copy_path(path, reverse), iterations, search_stats)
+
+        result = self.__find_path(from_point, to_point, heuristic, None, stats)
+        self.path_cache.store(version, "find_path", heuristic, from_point, to_point,
+                              (copy_path(result.path), result.iterations, result.stats.copy()))
+        return result
+
+    def __find_path(self, from_point, to_point, heuristic, max_iterations, stats):
+        """ Runs find_path's search, without the cache. """
+
+        search_stats = SearchStats()
+
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
+
+        connected = self.graph.connected(from_cell, to_cell)
+        search_stats.lap("graph")
+        if not connected:
+            return self.__result(None, 0, search_stats, stats)
+
+        # All state written by this search is kept in its own context
+        context = SearchContext(self.graph, from_cell, self.cell_heuristic(to_point, heuristic))
+        search_stats.lap("heuristic")
+
+        path, iterations = self.__run_search(context, to_cell, max_iterations, search_stats)
+        return self.__result(path, iterations, search_stats, stats)
+
+    def __run_search(self, context, to_cell, max_iterations, stats):
+        """ Expands the cells of *context* until *to_cell* is reached, returning a tuple of the path and the
+            number of iterations taken like find_path, and adding the search's counts to *stats*.
+        """
+        on_expand = self.on_expand
+
+        path = None
+        iterations = 0
 
-        timing_start = time.perf_counter() # for statistics
+        while len(context.open_nodes) > 0 and (max_iterations is None or iterations < max_iterations):
+            iterations += 1
+
+            q = context.pop()
+            if on_expand is not None: on_expand(context, q)
 
-        while not path and iterations < 10000:
-            if iterations % 2 == 0: # Calculate next move for A path
-                path = self.find_next_move(a_open_nodes, a_closed_nodes, b_closed_nodes, b_node)
-            else: # Calculate next move for B path
-                path = self.find_next_move(b_open_nodes, b_closed_nodes, a_closed_nodes, a_node)
-            iterations += 1      
+            if q == to_cell:
+                stats.lap("search")
+                path = context.get_path(q)
+                stats.lap("path")
+                break
+
+            context.relax(q)
+        else:
+            stats.lap("search")
+
+        stats.expanded += iterations
+        stats.record(context)
+        return (path, iterations)
+
+    def __result(self, path, iterations, search_stats, stats):
+        """ Returns the SearchResult of a search, adding its counts to the caller's *stats* if given. """
+        if stats is not None:
+            stats.add(search_stats)
+        return SearchResult(path, iterations, search_stats)
+
+    def find_weighted_path(self, from_point, to_point, heuristic=None, max_iterations=None, stats=None):
+        """ Finds the cheapest path between two points with A* search, where entering a cell costs the maze's
+            cost for it, see Maze.set_cost, instead of 1. As the costs are small integers, the open list is a
+            BucketQueue, whose operations take constant time instead of a heap's logarithmic time.
+
+            The heuristic is scaled by the lowest cost in the maze and rounded down, so that it stays
+            admissible. Returns a SearchResult like find_path's, and takes the same *max_iterations* and *stats*.
+            path_cost() gives the cost of the path.
+        """
+
+        search_stats = SearchStats()
+
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
+
+        connected = self.graph.connected(from_cell, to_cell)
+        search_stats.lap("graph")
+        if not connected:
+            return self.__result(None, 0, search_stats, stats)
+
+        costs = getattr(self.maze, 'costs', None)
+        lowest = self.maze.lowest_cost() if hasattr(self.maze, 'lowest_cost') else lowest_cost(costs)
+        h = integer_heuristic(self.cell_heuristic(to_point, heuristic), lowest)
+        context = WeightedContext(self.graph, from_cell, h, costs)
+        search_stats.lap("heuristic")
+
+        path, iterations = self.__run_search(context, to_cell, max_iterations, search_stats)
+        return self.__result(path, iterations, search_stats, stats)
+
+    def path_cost(self, path):
+        """ Returns the cost of following a path ordered from its goal back to its start, as the searches
+            return them: the sum of the costs of every cell entered after the start.
+        """
+        return sum(self.maze.cost(pos) for pos in path[:-1])
+
+    def find_anytime_path(self, from_point, to_point, heuristic=None, time_limit=None, max_iterations=None,
+                          initial_weight=2.5, weight_step=0.5):
+        """ Finds a path between two points with anytime repairing A* (ARA*), for when an answer is needed
+            within *time_limit* seconds or *max_iterations* expansions, whichever runs out first.
+
+            A first path is found quickly with A* on a heuristic inflated by *initial_weight*, which is then
+            lowered by *weight_step* at a time towards 1, each pass reusing the previous one's work to find a
+            shorter path, until the path is proven optimal or the budget runs out.
+
+            Returns a dict like find_bidirectional_path's with the best path found, where "bound" is the
+            largest factor by which it can exceed the shortest path, and "optimal" is True if it is proven
+            shortest. Without limits, the search runs until "optimal" is True. If the points are not
+            connected, "found" is False, "paths" is empty and "optimal" is True, whether this was known
+            before searching or found by running out of cells to expand.
+            Cells reopened between passes are counted in the "reopened" of "stats".
+        """
+
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
+
+        timing_start = time.perf_counter() # for statistics
+        deadline = timing_start + time_limit if time_limit is not None else None
+        stats = SearchStats()
+
+        if not self.graph.connected(from_cell, to_cell):
+            stats.lap("graph")
+            return {
+                "paths": [],
+                "found": False,
+                "optimal": True,
+                "bound": 1.0,
+                "iterations": 0,
+                "duration": time.perf_counter() - timing_start,
+                "stats": stats
+            }
+        stats.lap("graph")
+
+        weight = max(1.0, initial_weight)
+        context = AnytimeContext(self.graph, from_cell, self.cell_heuristic(to_point, heuristic), weight)
+        stats.lap("heuristic")
+
+        on_expand = self.on_expand
+
+        # The highest lower bound on the length of the shortest path proven by a finished pass
+        lower_bound = 0
+        iterations = 0
+        out_of_budget = False
+
+        while True:
+            # One pass of weighted A*, until no open cell could lead to a shorter path than the goal's
+            open_nodes = context.open_nodes
+            while len(open_nodes) > 0 and context.g.get(to_cell, float('inf')) > open_nodes.minPriority():
+                if (max_iterations is not None and iterations >= max_iterations) or \
+                        (deadline is not None and time.perf_counter() >= deadline):
+                    out_of_budget = True
+                    break
+
+                iterations += 1
+                q = context.pop()
+                if on_expand is not None: on_expand(context, q)
+                context.relax(q)
+
+            if out_of_budget: break
+
+            # The open list ran out without reaching the goal, which happens on graphs such as TiledGraph
+            # whose connected() only checks passability
+            if to_cell not in context.g: break
+
+            lower_bound = max(lower_bound, context.lower_bound())
+            if weight == 1.0 or context.g[to_cell] <= lower_bound: break
+
+            weight = max(1.0, min(weight - weight_step, context.g[to_cell] / lower_bound))
+            context.set_weight(weight)
+
+        # The bound also holds part way through a pass, as the shortest path always crosses an open or
+        # inconsistent cell whose g is already exact
+        lower_bound = max(lower_bound, context.lower_bound())
+        stats.lap("search")
+
+        paths = []
+        bound = float('inf')
+        if to_cell in context.g:
+            paths.append(context.get_path(to_cell))
+            stats.lap("path")
+
+            # A finished pass at weight 1 is plain A*, whose path is optimal
+            cost = context.g[to_cell]
+            if cost <= lower_bound or (not out_of_budget and weight == 1.0):
+                bound = 1.0
+            elif lower_bound > 0:
+                bound = cost / lower_bound
+        elif not out_of_budget:
+            # Every cell reachable from the start was expanded, so it is proven that there is no path
+            bound = 1.0
+
+        stats.expanded += iterations
+        stats.record(context)
 
         timing_end = time.perf_counter() # for statistics
 
         return {
-            "paths": path,
+            "paths": paths,
+            "found": bool(paths),
+            "optimal": bound == 1.0,
+            "bound": bound,
             "iterations": iterations,
-            "duration": timing_end - timing_start
+            "duration": timing_end - timing_start,
+            "stats": stats
         }
 
-    def find_next_move(self, open_nodes, closed_nodes, ext_closed_nodes, to_node):
+    def find_jps_path(self, from_point, to_point, heuristic=None, jps_plus=False, max_iterations=None, stats=None):
+        """ Finds the shortest path between two points with jump point search, which only expands
+            the cells where an optimal path may turn. With *jps_plus*, jumps are read from the
+            precomputed jump_distances tables instead of scanned cell by cell.
 
-        q = open_nodes.popMin()
-        closed_nodes.insert(q)
+            Returns a SearchResult of the full, cell by cell path, ordered from *to_point* back to
+            *from_point*, and the number of iterations taken, like find_path, which *max_iterations*
+            also limits in the same way, as does *stats*. Building the JPS+ tables counts as "graph" time.
+        """
 
-        if q == to_node:
-            return q.get_path()
-        else:
-            for n in ext_closed_nodes.queue:
-                if q.pos == n.pos:
-                    b_path = n.get_path()
-                    return [q.get_path(), b_path]
-
-        for neighbor in q.neighbors:
-            
-            # Skip nodes already in closed nodes list
-            if closed_nodes.containsPosition(neighbor): continue
-
-            existing_node = open_nodes.containsPosition(neighbor)
-            if not existing_node:
-                neighbor.parent = q
-                neighbor.g = q.g + 1
-                neighbor.f = neighbor.g + neighbor.h
-                open_nodes.insert(neighbor)
-            else:
-                if existing_node.g < q.g:
-                    existing_node.parent = q
-                    existing_node.g = q.g - 1
-                    existing_node.f = existing_node.g + existing_node.h
-
-            if neighbor.g < q.g:
-                existing_node = closed_nodes.containsPosition(neighbor)
-                if existing_node:
-                    neighbor.parent = existing_node
-            elif neighbor.g > q.g:
-                existing_node = open_nodes.containsPosition(neighbor)
-                if existing_node:
-                    existing_node.parent = q
-            elif not open_nodes.containsPosition(neighbor) and not closed_nodes.containsPosition(neighbor):
-                open_nodes.insert(q)
-
-        return False
-
-    def find_novel_path(self, from_point, to_point):
-        """ Uses our approach to bi-directional A* search to find the shortest path passing through the midpoint. """
-        
-        mp = self.maze.calculate_mp(from_point, to_point)
-        total_iterations = 0 # for statistics
+        search_stats = SearchStats()
 
-        timing_start = time.perf_counter() # for statistics
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
 
-        # Calculate path from midpoint to start
-        path_to_start, iterations = self.find_path(mp, from_point)
-        total_iterations += iterations
+        connected = self.graph.connected(from_cell, to_cell)
+        if not connected:
+            search_stats.lap("graph")
+            return self.__result(None, 0, search_stats, stats)
 
-        # Calculate path from midpoint to goal
-        path_to_goal, iterations = self.find_path(mp, to_point)
-        total_iterations += iterations
+        jump_distances = self.jump_distances if jps_plus else None
+        search_stats.lap("graph")
 
-        timing_end = time.perf_counter() # for statistics
+        context = JumpPointContext(
+            self.graph,
+            from_cell,
+            to_cell,
+            self.cell_heuristic(to_point, heuristic),
+            jump_distances
+        )
+        search_stats.lap("heuristic")
 
-        return {
-            "paths": [path_to_start, path_to_goal],
-            "iterations": total_iterations,
-            "duration": timing_end - timing_start
-        }
+        path, iterations = self.__run_search(context, to_cell, max_iterations, search_stats)
+        return self.__result(path, iterations, search_stats, stats)
 
-    def find_path(self, from_point, to_point):
+    def find_contracted_path(self, from_point, to_point, heuristic=None, stats=None):
+        """ Finds the shortest path between two points by searching the junction_graph, where every
+            corridor is a single edge, then expanding the result back into cells.
 
-        # Calculate and store straight line distances to destination
-        self.calculate_sl_distances(to_point)
+            Returns a SearchResult of the full, cell by cell path, ordered from *to_point* back to
+            *from_point*, and the number of junctions expanded, like find_path, and takes the same
+            *stats*. Building the junction graph counts as "graph" time.
+        """
 
-        # Keep track of the start and end nodes
-        from_node = self.node_matrix[from_point[1]][from_point[0]]
-        to_node = self.node_matrix[to_point[1]][to_point[0]]
+        search_stats = SearchStats()
 
-        # Keep track of all "open" nodes
-        open_nodes = PriorityQueue()
-        open_nodes.insert(from_node)
-        
-        closed_nodes = PriorityQueue()
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
 
-        iterations = 0
+        if not self.graph.connected(from_cell, to_cell):
+            search_stats.lap("graph")
+            return self.__result(None, 0, search_stats, stats)
 
-        while len(open_nodes) > 0 and iterations < 10000:
-            iterations += 1
+        junction_graph = self.junction_graph
+        search_stats.lap("graph")
+
+        cell_heuristic = self.cell_heuristic(to_point, heuristic)
+        search_stats.lap("heuristic")
+
+        cells, iterations = junction_graph.find_path(from_cell, to_cell, cell_heuristic, search_stats)
+        search_stats.expanded += iterations
+        search_stats.lap("search")
+        if cells is None:
+            return self.__result(None, iterations, search_stats, stats)
+
+        path = [self.graph.position(cell) for cell in reversed(cells)]
+        search_stats.lap("path")
+        return self.__result(path, iterations, search_stats, stats)
+
+    def find_hierarchical_path(self, from_point, to_point, heuristic=None, stats=None):
+        """ Finds a near-optimal path between two points with HPA*: an abstract search over the
+            cluster_graph, followed by refinement of each abstract edge inside its cluster.
+
+            Returns a SearchResult of the full, cell by cell path, ordered from *to_point* back to
+            *from_point*, and the number of abstract nodes expanded, like find_path, and takes the
+            same *stats*. Building the clusters counts as "graph" time, and refinement as "path" time.
+        """
+
+        search_stats = SearchStats()
+
+        from_cell = self.graph.cell_id(from_point)
+        to_cell = self.graph.cell_id(to_point)
+
+        if not self.graph.connected(from_cell, to_cell):
+            search_stats.lap("graph")
+            return self.__result(None, 0, search_stats, stats)
+
+        cluster_graph = self.cluster_graph
+        search_stats.lap("graph")
+
+        cell_heuristic = self.cell_heuristic(to_point, heuristic)
+        search_stats.lap("heuristic")
+
+        abstract_path, iterations = cluster_graph.find_abstract_path(from_cell, to_cell, cell_heuristic, search_stats)
+        search_stats.expanded += iterations
+        search_stats.lap("search")
+        if abstract_path is None:
+            return self.__result(None, iterations, search_stats, stats)
 
-            q = open_nodes.popMin()
-            closed_nodes.insert(q)
-            
-            if q == to_node:
-                return (q.get_path(), iterations)
-
-            for neighbor in q.neighbors:
-                
-                # Skip nodes already in closed nodes list
-                if closed_nodes.containsPosition(neighbor): continue
-
-                existing_node = open_nodes.containsPosition(neighbor)
-                if not existing_node:
-                    neighbor.parent = q
-                    neighbor.g = q.g + 1
-                    neighbor.f = neighbor.g + neighbor.h
-                    open_nodes.insert(neighbor)
-                else:
-                    if existing_node.g < q.g:
-                        existing_node.parent = q
-                        existing_node.g = q.g - 1
-                        existing_node.f = existing_node.g + existing_node.h
-
-                if neighbor.g < q.g:
-                    existing_node = closed_nodes.containsPosition(neighbor)
-                    if existing_node:
-                        neighbor.parent = existing_node
-                elif neighbor.g > q.g:
-                    existing_node = open_nodes.containsPosition(neighbor)
-                    if existing_node:
-                        existing_node.parent = q
-                elif not open_nodes.containsPosition(neighbor) and not closed_nodes.containsPosition(neighbor):
-                    open_nodes.insert(q)
\ No newline at end of file
+        path = [self.graph.position(cell) for cell in cluster_graph.refine(abstract_path)]
+        path.reverse()
+        search_stats.lap("path")
+        return self.__result(path, iterations, search_stats, stats)
@@ -0,0 +1,93 @@
+#
+# This module contains SearchContext, the per-query state of an A* search over a GridGraph.
+#
+
+from priorityqueue import PriorityQueue, identity_key
+
+class SearchContext:
+    """SearchContext
+        Holds everything a single search writes: the g and parent values of the cells it has reached,
+        and its open and closed sets. The GridGraph being searched is only ever read, so any number of
+        contexts can search the same graph at the same time, and no search sees another's leftovers.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to search
+        from_cell: int
+            the cell id the search starts from
+        heuristic: function
+            returns the heuristic value of a cell id, see heuristics.cell_heuristic
+    """
+    # The open list type, which subclasses may replace with another of the same interface
+    queue_type = PriorityQueue
+
+    def __init__(self, graph, from_cell, heuristic):
+        self.graph = graph
+        self.heuristic = heuristic
+
+        # Heuristic values of the cells this search has generated, computed on first use
+        self.h = {}
+
+        self.g = {from_cell: 0}
+        self.parent = {from_cell: -1}
+
+        self.open_nodes = self.queue_type(identity_key, self.f)
+        self.closed_nodes = set()
+
+        # for statistics, see SearchStats.record
+        self.peak_closed = 0
+        self.reopened = 0
+
+        self.open_nodes.insert(from_cell)
+
+    def f(self, cell):
+        h = self.h.get(cell)
+        if h is None:
+            h = self.h[cell] = self.heuristic(cell)
+        return self.g[cell] + h
+
+    def reset_heuristic(self, heuristic):
+        """ Switches the search to *heuristic*. The open list is ordered by the f each cell had when it was
+            inserted, so it is reordered with the new values.
+        """
+        self.heuristic = heuristic
+        self.h = {}
+        self.open_nodes.reprioritize()
+
+    def pop(self):
+        """ Removes the open cell with the lowest f, closes it and returns it. """
+        cell = self.open_nodes.popMin()
+        self.closed_nodes.add(cell)
+        return cell
+
+    def relax(self, cell):
+        """ Opens every neighbor of *cell*, or lowers its g if the route through *cell* is shorter.
+            Returns the neighbors whose g was set.
+        """
+        g, parent, open_nodes, closed_nodes = self.g, self.parent, self.open_nodes, self.closed_nodes
+
+        updated = []
+        neighbor_g = g[cell] + 1
+        for offset in self.graph.mask_offsets[self.graph.neighbor_masks[cell]]:
+            neighbor = cell + offset
+
+            # Skip cells already in closed nodes list
+            if neighbor in closed_nodes: continue
+
+            existing_g = g.get(neighbor)
+            if existing_g is None or neighbor_g < existing_g:
+                g[neighbor] = neighbor_g
+                parent[neighbor] = cell
+                open_nodes.insert(neighbor)
+                updated.append(neighbor)
+
+        return updated
+
+    def get_path(self, cell):
+        """ Returns an array of positions from *cell* back to the start of the search, following parent. """
+        path = []
+        while cell != -1:
+            path.append(self.graph.position(cell))
+            cell = self.parent[cell]
+        return path
@@ -0,0 +1,127 @@
+#
+# This module contains SearchStats, the counters and phase timings reported with the results of SearchableMaze's searches.
+#
+
+import time
+
+PHASES = ("graph", "heuristic", "search", "path")
+
+# The counters of SearchStats, which add() sums
+COUNTS = ("expanded", "generated", "pushes", "pops", "decreases", "peak_open", "peak_closed", "reopened")
+
+class SearchStats:
+    """SearchStats
+        What a search did, and where its time went. Counts are collected from the search's contexts when
+        it finishes, so gathering them costs nothing per expansion. A SearchStats passed to several searches
+        adds up their counts and times.
+
+        expanded: cells taken off the open list and expanded
+        generated: cells reached, that is given a g value, including the start
+        pushes, pops, decreases: open list insertions, removals of the minimum, and lowered priorities
+        peak_open, peak_closed: the most cells on the open list and in the closed set at any one time
+        reopened: closed cells put back on the open list after a shorter route to them was found
+        phases: seconds spent in each of PHASES: "graph" checking connectivity (labelling components the
+            first time) and building any preprocessed graph or table the search uses the first time, such as
+            the JPS+ tables, junction graph or HPA* clusters, "heuristic" setting up the heuristic, "search"
+            the search loop, including heuristic evaluations, and "path" reconstructing the path. Some
+            searches time further phases, such as find_novel_path's "midpoint".
+
+        The contracted and hierarchical searches count junctions and abstract nodes rather than cells.
+
+        cached: True for the stats of a result served from a PathCache, which are a copy of those of the
+            search that first produced it
+    """
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.pushes = 0
+        self.pops = 0
+        self.decreases = 0
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.reopened = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.cached = False
+
+        self.lap_start = time.perf_counter()
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
+
+    def start(self):
+        """ Starts timing the first phase of a search. """
+        self.lap_start = time.perf_counter()
+
+    def lap(self, phase):
+        """ Adds the time since the last lap, or since start(), to *phase*. """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.lap_start
+        self.lap_start = now
+
+    def record(self, context):
+        """ Adds the counts of a finished SearchContext. Peaks are added too, as the contexts of one search,
+            such as the two sides of a bidirectional search, are alive together.
+        """
+        self.record_queue(context.open_nodes, len(context.g), max(context.peak_closed, len(context.closed_nodes)))
+        self.reopened += context.reopened
+
+    def record_queue(self, open_nodes, generated, closed):
+        """ Adds the counts of a finished search that keeps its own open list rather than a SearchContext,
+            such as the junction and abstract graph searches: the queue's counters, the *generated* nodes
+            and the most nodes *closed* at once.
+        """
+        self.generated += generated
+        self.pushes += open_nodes.pushes
+        self.pops += open_nodes.pops
+        self.decreases += open_nodes.decreases
+        self.peak_open += open_nodes.peak_size
+        self.peak_closed += closed
+
+    def add(self, other):
+        """ Adds the counts and phase times of another SearchStats to these. """
+        for name in COUNTS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for phase, seconds in other.phases.items():
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def copy(self):
+        stats = SearchStats()
+        stats.add(self)
+        stats.cached = self.cached
+        return stats
+
+    def as_dict(self):
+        return {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "decreases": self.decreases,
+            "peak_open": self.peak_open,
+            "peak_closed": self.peak_closed,
+            "reopened": self.reopened,
+            "phases": dict(self.phases),
+            "cached": self.cached
+        }
+
+class SearchResult(tuple):
+    """SearchResult
+        The result of a search that finds one path, such as SearchableMaze.find_path. It unpacks as the
+        (path, iterations) tuple these searches have always returned, and carries the search's SearchStats
+        as *stats*.
+    """
+    def __new__(cls, path, iterations, stats):
+        result = super().__new__(cls, (path, iterations))
+        result.stats = stats
+        return result
+
+    def __reduce__(self):
+        return (SearchResult, (self[0], self[1], self.stats))
+
+    @property
+    def path(self):
+        return self[0]
+
+    @property
+    def iterations(self):
+        return self[1]
@@ -8,9 +8,6 @@ from colorama import Fore, Back, Style
 from maze import Maze, Block
 from searchablemaze import Node, SearchableMaze
 
-# For plotting
-import matplotlib.pyplot as plt # for visualization
-
 def test(start, end):
     maze_size = (40, 20)
 
@@ -30,8 +27,8 @@ def test(start, end):
     maze.draw_path(novel_results['paths'][0], Block.PATH)
     maze.draw_path(novel_results['paths'][1], Block.PATH)
 
-    maze.draw_path(bi_results['paths'][0], Block.HIGHLIGHT_1)
-    maze.draw_path(bi_results['paths'][1], Block.HIGHLIGHT_1)
+    for path in bi_results['paths']:
+        maze.draw_path(path, Block.HIGHLIGHT_1)
 
     maze.print()
 
@@ -110,6 +107,9 @@ def iterative_test(iter_count):
     }
 
 def plot(a, b, title='', ylabel='', xlabel=''):
+    # imported here, so that the module imports without matplotlib; see benchmark.py for headless runs
+    import matplotlib.pyplot as plt
+
     plt.plot(a[1], label=a[0])
     plt.plot(b[1], label=b[0])
 
@@ -182,4 +182,5 @@ def generate_plot(tests=10):
     plot(('Traditional Duration',durations_bi), ('Novel Duration',durations_novel),'Traditional v. Novel Duration', 'Duration (s)', 'Test')
     plot(('Traditional Iterations',iterations_bi), ('Novel Iterations',iterations_novel),'Traditional v. Novel Iterations', 'Search Iterations', 'Test')
 
-generate_plot(10)
\ No newline at end of file
+if __name__ == "__main__":
+    generate_plot(10)
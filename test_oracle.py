@@ -0,0 +1,294 @@
+#
+# This module contains oracle tests for the searches of SearchableMaze. Every entry point is run over seeded mazes and
+# its answers are checked against a plain breadth first search, or Dijkstra's algorithm for weighted searches, over
+# the maze's matrix, which shares no code with the searches under test.
+#
+#   python -m unittest test_oracle
+#
+
+import heapq, os, random, tempfile, unittest
+from collections import deque
+from bitboard import positions
+from maze import Maze, Block
+from searchablemaze import SearchableMaze
+
+SEED = 20240601
+QUERIES = 12
+
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+def passable(matrix, pos):
+    x, y = pos
+    return 0 <= y < len(matrix) and 0 <= x < len(matrix[0]) and matrix[y][x] != Block.WALL
+
+def oracle_distances(matrix, from_point):
+    """ Returns a dict of the number of steps from *from_point* to every cell reachable from it. """
+    distances = {tuple(from_point): 0}
+    if not passable(matrix, from_point): return {}
+
+    frontier = deque([tuple(from_point)])
+    while frontier:
+        x, y = frontier.popleft()
+        for step_x, step_y in STEPS:
+            neighbor = (x + step_x, y + step_y)
+            if neighbor not in distances and passable(matrix, neighbor):
+                distances[neighbor] = distances[(x, y)] + 1
+                frontier.append(neighbor)
+    return distances
+
+def oracle_cost(maze, from_point, to_point):
+    """ Returns the cost of the cheapest path between two points with Dijkstra's algorithm, or None. """
+    costs = {tuple(from_point): 0}
+    heap = [(0, tuple(from_point))]
+    while heap:
+        cost, (x, y) = heapq.heappop(heap)
+        if (x, y) == tuple(to_point): return cost
+        if cost > costs[(x, y)]: continue
+        for step_x, step_y in STEPS:
+            neighbor = (x + step_x, y + step_y)
+            if not passable(maze.matrix, neighbor): continue
+            neighbor_cost = cost + maze.cost(neighbor)
+            if neighbor_cost < costs.get(neighbor, neighbor_cost + 1):
+                costs[neighbor] = neighbor_cost
+                heapq.heappush(heap, (neighbor_cost, neighbor))
+    return None
+
+def generated_maze(columns, rows, algorithm, seed):
+    maze = Maze()
+    maze.generate((columns, rows), (0, 0), (columns - 1, rows - 1), algorithm, seed=seed)
+    return maze
+
+def random_maze(columns, rows, density, seed):
+    """ Returns a maze of randomly placed walls, which unlike a generated maze has loops, open areas and cells
+        that cannot be reached from each other.
+    """
+    maze = generated_maze(columns, rows, "sidewinder", seed)
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(0, rows) for x in range(0, columns)]
+    maze.draw_path(cells, Block.PATH)
+    maze.draw_path([pos for pos in cells if rng.random() < density], Block.WALL)
+    return maze
+
+def random_queries(maze, rng, count):
+    """ Returns *count* pairs of passable cells, which need not be connected. """
+    cells = [(x, y) for y, row in enumerate(maze.matrix) for x, block in enumerate(row) if block != Block.WALL]
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(0, count)]
+
+class OracleTestCase(unittest.TestCase):
+    """OracleTestCase
+        Runs every query of a set of seeded mazes through a search, checking the result against the oracle.
+    """
+    def setUp(self):
+        rng = random.Random(SEED)
+        self.mazes = [
+            generated_maze(31, 21, "backtracker", SEED),
+            generated_maze(33, 25, "kruskal", SEED + 1),
+            generated_maze(41, 17, "eller", SEED + 2),
+            generated_maze(45, 31, "sidewinder", SEED + 3),
+            random_maze(30, 30, 0.3, SEED + 4),
+            random_maze(40, 24, 0.4, SEED + 5),
+        ]
+        self.cases = []
+        for maze in self.mazes:
+            queries = [(maze.start, maze.end)] + random_queries(maze, rng, QUERIES)
+            distances = [oracle_distances(maze.matrix, a).get(tuple(b)) for a, b in queries]
+            self.cases.append((maze, list(zip(queries, distances))))
+
+    def assertPath(self, maze, path, from_point, to_point, distance=None):
+        """ Checks that *path* joins the points, ordered from *to_point* back to *from_point*, through adjacent
+            passable cells, and that it takes *distance* steps if given.
+        """
+        self.assertEqual(tuple(path[0]), tuple(to_point))
+        self.assertEqual(tuple(path[-1]), tuple(from_point))
+        for pos, next_pos in zip(path, path[1:]):
+            self.assertTrue(passable(maze.matrix, pos))
+            self.assertEqual(abs(pos[0] - next_pos[0]) + abs(pos[1] - next_pos[1]), 1)
+        if distance is not None:
+            self.assertEqual(len(path) - 1, distance)
+
+    def check_exact(self, search):
+        """ Checks that search(searchable, a, b) returns a shortest path, or None if there is none. """
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            for (a, b), distance in queries:
+                path = search(searchable, a, b)
+                if distance is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assertPath(maze, path, a, b, distance)
+
+    def check_bounded(self, search):
+        """ Checks that search(searchable, a, b) returns a path, not necessarily a shortest one, or None. """
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            for (a, b), distance in queries:
+                path = search(searchable, a, b)
+                if distance is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assertPath(maze, path, a, b)
+                    self.assertGreaterEqual(len(path) - 1, distance)
+
+class TestExactSearches(OracleTestCase):
+    def test_find_path(self):
+        for heuristic in ("manhattan", "euclidean", "landmarks"):
+            with self.subTest(heuristic=heuristic):
+                self.check_exact(lambda searchable, a, b: searchable.find_path(a, b, heuristic).path)
+
+    def test_find_path_cached(self):
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze, cache_size=64)
+            for (a, b), distance in queries:
+                for from_point, to_point in ((a, b), (b, a), (a, b)):
+                    path = searchable.find_path(from_point, to_point).path
+                    if distance is None:
+                        self.assertIsNone(path)
+                    else:
+                        self.assertPath(maze, path, from_point, to_point, distance)
+
+    def test_find_bidirectional_path(self):
+        def search(searchable, a, b):
+            result = searchable.find_bidirectional_path(a, b)
+            return result["paths"][0] if result["found"] else None
+        self.check_exact(search)
+
+    def test_find_jps_path(self):
+        for jps_plus in (False, True):
+            with self.subTest(jps_plus=jps_plus):
+                self.check_exact(lambda searchable, a, b: searchable.find_jps_path(a, b, jps_plus=jps_plus).path)
+
+    def test_find_contracted_path(self):
+        self.check_exact(lambda searchable, a, b: searchable.find_contracted_path(a, b).path)
+
+    def test_find_anytime_path(self):
+        def search(searchable, a, b):
+            result = searchable.find_anytime_path(a, b)
+            self.assertTrue(result["optimal"])
+            return result["paths"][0] if result["found"] else None
+        self.check_exact(search)
+
+    def test_find_paths_from(self):
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            from_point = queries[0][0][0]
+            to_points = [b for (a, b), distance in queries]
+            distances = oracle_distances(maze.matrix, from_point)
+
+            results = {index: path for index, path, iterations in searchable.find_paths_from(from_point, to_points)}
+            self.assertEqual(sorted(results), list(range(0, len(to_points))))
+            for index, to_point in enumerate(to_points):
+                distance = distances.get(tuple(to_point))
+                if distance is None:
+                    self.assertIsNone(results[index])
+                else:
+                    self.assertPath(maze, results[index], from_point, to_point, distance)
+
+    def test_find_paths(self):
+        for method in ("find_path", "find_bidirectional_path", "find_jps_path", "find_contracted_path"):
+            for maze, queries in self.cases:
+                searchable = SearchableMaze(maze)
+                results = list(searchable.find_paths([query for query, distance in queries], method, processes=1))
+                self.assertEqual(len(results), len(queries))
+                for result in results:
+                    (a, b), distance = queries[result["index"]]
+                    self.assertEqual(result["found"], distance is not None, method)
+                    if distance is not None:
+                        self.assertPath(maze, result["paths"][0], a, b, distance)
+
+    def test_loaded_graph(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for index, (maze, queries) in enumerate(self.cases):
+                filename = os.path.join(directory, f"{index}.amaz")
+                maze.save(filename, graph=True)
+                loaded = Maze()
+                loaded.load(filename)
+                self.assertIsNotNone(loaded.graph_buffers())
+
+                searchable = SearchableMaze(loaded)
+                for (a, b), distance in queries:
+                    path = searchable.find_path(a, b).path
+                    if distance is None:
+                        self.assertIsNone(path)
+                    else:
+                        self.assertPath(maze, path, a, b, distance)
+
+class TestApproximateSearches(OracleTestCase):
+    def test_find_novel_path(self):
+        def search(searchable, a, b):
+            result = searchable.find_novel_path(a, b)
+            if not result["found"]: return None
+            # The halves run from a and from b to the midpoint, and are joined into one path from b back to a
+            from_half, to_half = result["paths"]
+            self.assertEqual(from_half[-1], to_half[-1])
+            return to_half + from_half[-2::-1]
+        self.check_bounded(search)
+
+    def test_find_hierarchical_path(self):
+        self.check_bounded(lambda searchable, a, b: searchable.find_hierarchical_path(a, b).path)
+
+class TestDistanceQueries(OracleTestCase):
+    def test_is_reachable(self):
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            for (a, b), distance in queries:
+                self.assertEqual(searchable.is_reachable(a, b), distance is not None)
+
+    def test_shortest_distance(self):
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            for (a, b), distance in queries:
+                self.assertEqual(searchable.shortest_distance(a, b), distance)
+
+    def test_cells_within(self):
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            point = queries[1][0][0]
+            distances = oracle_distances(maze.matrix, point)
+            for steps in (0, 1, 5, 20):
+                expected = {pos for pos, distance in distances.items() if distance <= steps}
+                self.assertEqual(set(positions(searchable.cells_within(point, steps))), expected)
+
+class TestWeightedSearch(OracleTestCase):
+    def test_find_weighted_path(self):
+        rng = random.Random(SEED)
+        for maze, queries in self.cases:
+            columns, rows = len(maze.matrix[0]), len(maze.matrix)
+            for _ in range(0, 6):
+                corner = (rng.randrange(columns), rng.randrange(rows))
+                other = (rng.randrange(columns), rng.randrange(rows))
+                maze.fill_cost(corner, other, rng.randint(2, 9))
+
+            searchable = SearchableMaze(maze)
+            for (a, b), distance in queries:
+                path = searchable.find_weighted_path(a, b).path
+                if distance is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assertPath(maze, path, a, b)
+                    self.assertEqual(searchable.path_cost(path), oracle_cost(maze, a, b))
+
+class TestReplanning(OracleTestCase):
+    def test_replanner(self):
+        rng = random.Random(SEED)
+        for maze, queries in self.cases:
+            searchable = SearchableMaze(maze)
+            (a, b), distance = queries[0]
+            replanner = searchable.replanner(a, b)
+
+            for _ in range(0, 8):
+                path, iterations = replanner.plan()
+                distance = oracle_distances(maze.matrix, a).get(tuple(b))
+                if distance is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assertPath(maze, path, a, b, distance)
+
+                # Open or close a cell next to the path, or anywhere if there is none
+                columns, rows = len(maze.matrix[0]), len(maze.matrix)
+                x, y = rng.choice(path) if path else (rng.randrange(columns), rng.randrange(rows))
+                pos = (min(max(x + rng.choice((-1, 0, 1)), 0), columns - 1), y)
+                if pos in (tuple(a), tuple(b)): continue
+                searchable.set_cell(pos, Block.PATH if maze.matrix[pos[1]][pos[0]] == Block.WALL else Block.WALL)
+
+if __name__ == "__main__":
+    unittest.main()
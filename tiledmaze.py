@@ -0,0 +1,286 @@
+#
+# This module contains TiledMaze, a maze stored on disk in fixed-size tiles and paged in through an LRU cache,
+# for grids larger than memory.
+#
+# A tiled maze file is a 36 byte header followed by the tiles, row after row of tiles:
+#
+#   magic       4s   b"AMZT"
+#   version     H    FORMAT_VERSION
+#   reserved    H
+#   tile_size   I    cells per side of each tile
+#   columns     I
+#   rows        I
+#   start       ii   (x, y) of the start, or (-1, -1) if unknown
+#   end         ii   (x, y) of the end, or (-1, -1) if unknown
+#
+# Each tile holds tile_size * tile_size Block values, one byte per cell, row after row. Tiles on the right
+# and bottom edges of the maze are padded with walls.
+#
+
+import os, struct, threading
+from collections import OrderedDict
+from maze import Block, Direction
+from gridgraph import GridGraph, PASSABLE_TABLE, neighbor_offsets, row_neighbor_masks
+
+MAGIC = b"AMZT"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIIiiii")
+
+# The cache always holds at least this many tiles, enough for a search to straddle a tile corner.
+MIN_CACHED_TILES = 4
+
+class TileCache:
+    """TileCache
+        A least recently used cache of tiles, holding as many as fit in *memory_budget* bytes.
+        The hits, misses and evictions counters can be read at any time to size the budget.
+    """
+    def __init__(self, load, tile_bytes, memory_budget):
+        self.load = load
+        self.capacity = max(MIN_CACHED_TILES, memory_budget // tile_bytes)
+
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, index):
+        """ Returns tile *index*, reading it from disk if it is not cached. """
+        with self.lock:
+            tile = self.tiles.get(index)
+            if tile is not None:
+                self.hits += 1
+                self.tiles.move_to_end(index)
+                return tile
+
+            self.misses += 1
+            tile = self.load(index)
+            self.tiles[index] = tile
+            while len(self.tiles) > self.capacity:
+                self.tiles.popitem(last=False)
+                self.evictions += 1
+            return tile
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "cached_tiles": len(self.tiles),
+            "capacity": self.capacity
+        }
+
+class TiledMaze:
+    """TiledMaze
+        A maze whose cells are read from a tiled maze file on demand. Only the tiles in its cache are held
+        in memory. Pass it to SearchableMaze to run its searches across tile boundaries. Preprocessing that
+        reads the whole grid, such as the JPS+ tables, junction graph and landmarks, pages every tile in once
+        and holds its results in memory. Connected components are not labelled, so find_novel_path may pick a
+        midpoint no path reaches, and the maze is read-only: SearchableMaze.set_cell raises NotImplementedError.
+
+        Parameters
+        __________
+        filename: str
+            a file written by TiledMaze.create
+        memory_budget: int
+            the most memory, in bytes, the tile cache may use
+    """
+    def __init__(self, filename, memory_budget=64 * 1024 * 1024):
+        self.file = open(filename, 'rb')
+
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{filename} is too short to be a tiled maze file.")
+
+        magic, version, reserved, self.tile_size, self.columns, self.rows, start_x, start_y, end_x, end_y = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a tiled maze file.")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{filename} uses tiled maze file version {version}, newer than {FORMAT_VERSION}.")
+
+        self.start = (start_x, start_y) if start_x >= 0 else None
+        self.end = (end_x, end_y) if end_x >= 0 else None
+        self.tile_columns = -(-self.columns // self.tile_size)
+        self.tile_rows = -(-self.rows // self.tile_size)
+        self.tile_bytes = self.tile_size * self.tile_size
+
+        self.cache = TileCache(self.__read_tile, self.tile_bytes, memory_budget)
+        self.graph = TiledGraph(self)
+
+    @staticmethod
+    def create(filename, buffer, columns, rows, tile_size=256, start=None, end=None):
+        """ Writes a one byte per cell maze *buffer*, such as Maze.buffer or a memory-mapped maze file, to
+            *filename* as tiles. Only one tile is assembled in memory at a time.
+        """
+        start = tuple(start) if start is not None else (-1, -1)
+        end = tuple(end) if end is not None else (-1, -1)
+        tile_columns = -(-columns // tile_size)
+        tile_rows = -(-rows // tile_size)
+
+        with open(filename, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, tile_size, columns, rows, *start, *end))
+
+            for tile_y in range(0, tile_rows):
+                for tile_x in range(0, tile_columns):
+                    tile = bytearray(tile_size * tile_size)
+                    min_x = tile_x * tile_size
+                    width = min(tile_size, columns - min_x)
+                    for row in range(0, min(tile_size, rows - tile_y * tile_size)):
+                        source = (tile_y * tile_size + row) * columns + min_x
+                        tile[row * tile_size:row * tile_size + width] = buffer[source:source + width]
+                    file.write(tile)
+
+    def __read_tile(self, index):
+        return os.pread(self.file.fileno(), self.tile_bytes, HEADER.size + index * self.tile_bytes)
+
+    def block(self, pos):
+        """ Returns the Block at an (x, y) position. """
+        x, y = pos[0], pos[1]
+        tile = self.cache.get((y // self.tile_size) * self.tile_columns + x // self.tile_size)
+        return Block(tile[(y % self.tile_size) * self.tile_size + x % self.tile_size])
+
+    def close(self):
+        self.file.close()
+
+class TiledView:
+    """ Read-only, cell id indexed view of one byte per cell of a TiledMaze, computed from its tiles as it is
+        read. Slices and iteration are assembled a row at a time, so whole-grid preprocessing, such as the
+        JunctionGraph and Bitboard builds, can read the grid through the tile cache.
+    """
+    __slots__ = ('graph',)
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __len__(self):
+        return self.graph.size
+
+    def __getitem__(self, cell):
+        size = self.graph.size
+        if isinstance(cell, slice):
+            start, stop, step = cell.indices(size)
+            if step != 1:
+                return bytes(self[start:stop])[::step] if start < stop else b''
+            return self.cells(start, stop)
+
+        if cell < 0: cell += size
+        if not 0 <= cell < size:
+            raise IndexError("cell id out of range")
+        return self.cell(cell)
+
+    def __iter__(self):
+        width = self.graph.width
+        for y in range(0, self.graph.height):
+            yield from self.row(y, 0, width)
+
+    def cells(self, start, stop):
+        """ Returns the values of cells *start* up to *stop* as bytes. """
+        width = self.graph.width
+        parts = []
+        while start < stop:
+            y, x = divmod(start, width)
+            x_end = min(width, x + stop - start)
+            parts.append(self.row(y, x, x_end))
+            start += x_end - x
+        return b''.join(parts)
+
+class TiledPassability(TiledView):
+    """ Whether each cell of a TiledMaze is passable, 1 or 0. """
+    __slots__ = ()
+
+    def cell(self, cell):
+        return 1 if self.graph.passable_at(cell % self.graph.width, cell // self.graph.width) else 0
+
+    def row(self, y, x_start, x_end):
+        return self.graph.passable_row(y, x_start, x_end)
+
+class TiledNeighborMasks(TiledView):
+    """ The neighbor mask of each cell of a TiledMaze. """
+    __slots__ = ()
+
+    def cell(self, cell):
+        return self.graph.neighbor_mask(cell)
+
+    def row(self, y, x_start, x_end):
+        return self.graph.neighbor_mask_row(y, x_start, x_end)
+
+class TiledGraph(GridGraph):
+    """TiledGraph
+        A GridGraph whose passability map and neighbor masks are computed from a TiledMaze's tile cache as
+        they are read, instead of being held in memory for the whole grid. Connected components are not
+        labelled, as that takes a flood fill over the whole grid; has_components is False.
+    """
+    def __init__(self, tiled_maze):
+        self.tiled_maze = tiled_maze
+        self.width = tiled_maze.columns
+        self.height = tiled_maze.rows
+        self.size = self.width * self.height
+
+        self.passable = TiledPassability(self)
+        self.neighbor_masks = TiledNeighborMasks(self)
+        self.offsets, self.mask_offsets = neighbor_offsets(self.width)
+
+        self.nodes = {}
+
+    has_components = False
+
+    @property
+    def components(self):
+        raise NotImplementedError("Connected components need the whole grid and are not available for tiled mazes.")
+
+    def connected(self, a_cell, b_cell):
+        """ Returns True if both cells are passable. Tiled mazes are not labelled, so whether a path joins
+            them is only known once a search finishes.
+        """
+        return bool(self.passable[a_cell]) and bool(self.passable[b_cell])
+
+    def passable_at(self, x, y):
+        maze = self.tiled_maze
+        tile_size = maze.tile_size
+        tile = maze.cache.get((y // tile_size) * maze.tile_columns + x // tile_size)
+        return tile[(y % tile_size) * tile_size + x % tile_size] != Block.WALL
+
+    def neighbor_mask(self, cell):
+        y, x = divmod(cell, self.width)
+        passable_at = self.passable_at
+
+        mask = 0
+        if y > 0 and passable_at(x, y - 1): mask |= 1 << Direction.NORTH
+        if x < self.width - 1 and passable_at(x + 1, y): mask |= 1 << Direction.EAST
+        if y < self.height - 1 and passable_at(x, y + 1): mask |= 1 << Direction.SOUTH
+        if x > 0 and passable_at(x - 1, y): mask |= 1 << Direction.WEST
+        return mask
+
+    def passable_row(self, y, x_start, x_end):
+        """ Returns the passability of cells *x_start* up to *x_end* of row *y* as bytes, reading the row
+            from one tile at a time.
+        """
+        maze = self.tiled_maze
+        tile_size = maze.tile_size
+        tile_row = (y // tile_size) * maze.tile_columns
+        offset = (y % tile_size) * tile_size
+
+        parts = []
+        x = x_start
+        while x < x_end:
+            tile = maze.cache.get(tile_row + x // tile_size)
+            tile_x = x % tile_size
+            count = min(tile_size - tile_x, x_end - x)
+            parts.append(tile[offset + tile_x:offset + tile_x + count])
+            x += count
+        return b''.join(parts).translate(PASSABLE_TABLE)
+
+    def neighbor_mask_row(self, y, x_start, x_end):
+        """ Returns the neighbor masks of cells *x_start* up to *x_end* of row *y* as bytes. """
+        count = x_end - x_start
+        if count <= 0: return b''
+        empty = bytes(count)
+
+        row = self.passable_row(y, x_start, x_end)
+        north = self.passable_row(y - 1, x_start, x_end) if y > 0 else empty
+        south = self.passable_row(y + 1, x_start, x_end) if y < self.height - 1 else empty
+        west_edge = 1 if x_start > 0 and self.passable_at(x_start - 1, y) else 0
+        east_edge = 1 if x_end < self.width and self.passable_at(x_end, y) else 0
+        return row_neighbor_masks(north, row, south, west_edge, east_edge)
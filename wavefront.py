@@ -0,0 +1,181 @@
+#
+# This module contains the NumPy wavefront breadth first search, which computes exact distance fields over a
+# whole maze with array operations instead of a Python loop per cell. NumPy is optional: check AVAILABLE
+# before calling anything here.
+#
+
+from array import array
+from maze import Block, Direction
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+
+# A frontier is expanded in one of three ways depending on its size. Fewer than SCALAR_LIMIT cells are
+# stepped by a plain Python loop, since a perfect maze is mostly corridors whose frontier is a handful of
+# cells for thousands of steps, and NumPy's per-call overhead would dominate. Larger frontiers are stepped
+# as arrays of cell ids, and frontiers holding more than DENSE_FRACTION of the grid, as in open rooms,
+# with whole-array shifts masked by the passability grid.
+SCALAR_LIMIT = 256
+DENSE_FRACTION = 1 / 32
+
+# Parent directions, in the order neighbors are claimed when two frontier cells reach the same cell.
+PARENT_ORDER = (Direction.WEST, Direction.EAST, Direction.NORTH, Direction.SOUTH)
+
+NO_PARENT = -1
+
+def wavefront(matrix, sources):
+    """ Breadth first search from every (x, y) position in *sources* at once over a Maze.matrix.
+
+        Returns (distances, parents), two arrays of the shape of the maze indexed [y, x]. distances is int32
+        and holds the number of steps from the nearest source, or -1 for unreachable cells. parents is int8
+        and holds the Direction of the neighbor one step closer to that source, or NO_PARENT for sources and
+        unreachable cells.
+    """
+    _require_numpy()
+
+    passable = np.asarray(matrix, dtype=np.uint8) != Block.WALL
+    if passable.ndim != 2:
+        passable = passable.reshape(len(matrix), -1)
+
+    rows, columns = passable.shape
+    source_cells = [pos[1] * columns + pos[0] for pos in sources]
+    return _expand(passable, source_cells)
+
+def graph_distances(graph, cells):
+    """ Wavefront search over a GridGraph from cell ids, returning an array('i') like GridGraph.distances_from. """
+    _require_numpy()
+
+    passable = np.frombuffer(graph.passable, dtype=np.uint8).reshape(graph.height, graph.width) != 0
+    distances, parents = _expand(passable, cells)
+    return array('i', distances.astype(np.intc).tobytes())
+
+def trace_path(distances, parents, pos):
+    """ Follows *parents* from an (x, y) position back to its nearest source. Returns the path as a list of
+        [x, y], ordered from *pos* back to the source like Node.get_path, or None if *pos* was not reached.
+    """
+    x, y = pos[0], pos[1]
+    if distances[y, x] == -1: return None
+
+    path = [[x, y]]
+
+    direction = parents[y, x]
+    while direction != NO_PARENT:
+        if direction == Direction.NORTH: y -= 1
+        elif direction == Direction.EAST: x += 1
+        elif direction == Direction.SOUTH: y += 1
+        else: x -= 1
+        path.append([x, y])
+        direction = parents[y, x]
+
+    return path
+
+def _require_numpy():
+    if not AVAILABLE:
+        raise ImportError("The wavefront search requires NumPy, which is not installed.")
+
+def _expand(passable, source_cells):
+    """ Runs the search on a boolean passability grid. The grid is padded with a border of walls so that the
+        flat cell id offsets and the shifts of the dense steps never wrap around. The state is kept in
+        Python buffers with NumPy views onto them, so the scalar and vectorized steps share it.
+    """
+    rows, columns = passable.shape
+    width = columns + 2
+    shape = (rows + 2, width)
+    size = shape[0] * shape[1]
+
+    unvisited_buffer = bytearray(size)
+    distances_buffer = array('i', [-1]) * size
+    parents_buffer = array('b', [NO_PARENT]) * size
+
+    unvisited = np.frombuffer(unvisited_buffer, dtype=bool).reshape(shape)
+    distances = np.frombuffer(distances_buffer, dtype=np.intc).reshape(shape)
+    parents = np.frombuffer(parents_buffer, dtype=np.int8).reshape(shape)
+    unvisited[1:-1, 1:-1] = passable
+
+    # Offsets from a frontier cell to the neighbor that would take it as parent in each PARENT_ORDER direction
+    offsets = {Direction.WEST: 1, Direction.EAST: -1, Direction.NORTH: width, Direction.SOUTH: -width}
+
+    # For the scalar steps, each cell gets a mask of its passable neighbors, with bit i set for the neighbor
+    # reached through PARENT_ORDER[i], so that walls are skipped without being looked at.
+    masks = np.zeros(shape, dtype=np.uint8)
+    padded = unvisited.ravel()
+    for bit, direction in enumerate(PARENT_ORDER):
+        offset = offsets[direction]
+        masks.ravel()[width:-width] |= padded[width + offset:size - width + offset].astype(np.uint8) << bit
+    masks_buffer = masks.tobytes()
+    mask_steps = tuple(
+        tuple((offsets[direction], int(direction)) for bit, direction in enumerate(PARENT_ORDER) if mask & (1 << bit))
+        for mask in range(16)
+    )
+
+    frontier = []
+    for cell in source_cells:
+        cell = (cell // columns + 1) * width + cell % columns + 1
+        if unvisited_buffer[cell]:
+            unvisited_buffer[cell] = 0
+            distances_buffer[cell] = 0
+            frontier.append(cell)
+
+    dense_threshold = max(SCALAR_LIMIT, int(rows * columns * DENSE_FRACTION))
+    distance = 0
+    while len(frontier):
+        distance += 1
+
+        if len(frontier) < SCALAR_LIMIT:
+            if not isinstance(frontier, list): frontier = frontier.tolist()
+
+            next_frontier = []
+            for cell in frontier:
+                for offset, direction in mask_steps[masks_buffer[cell]]:
+                    neighbor = cell + offset
+                    if unvisited_buffer[neighbor]:
+                        unvisited_buffer[neighbor] = 0
+                        distances_buffer[neighbor] = distance
+                        parents_buffer[neighbor] = direction
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+            continue
+
+        frontier = np.asarray(frontier, dtype=np.intp)
+        if len(frontier) > dense_threshold:
+            frontier = _dense_step(frontier, unvisited, parents)
+        else:
+            flat_unvisited, flat_parents = unvisited.ravel(), parents.ravel()
+            claimed = []
+            for direction in PARENT_ORDER:
+                candidates = frontier + offsets[direction]
+                candidates = candidates[flat_unvisited[candidates]]
+                flat_unvisited[candidates] = False
+                flat_parents[candidates] = direction
+                claimed.append(candidates)
+            frontier = np.concatenate(claimed)
+
+        distances.ravel()[frontier] = distance
+
+    return (distances[1:-1, 1:-1].astype(np.int32), parents[1:-1, 1:-1].copy())
+
+def _dense_step(frontier, unvisited, parents):
+    """ Expands a frontier of flat cell ids by shifting it one cell in each direction as a whole grid. """
+    current = np.zeros(unvisited.shape, dtype=bool)
+    current.ravel()[frontier] = True
+    reached = np.zeros(unvisited.shape, dtype=bool)
+
+    # Each entry pairs the cells that gain a parent in that direction with the frontier cells beside them.
+    shifts = {
+        Direction.WEST: (np.s_[:, 1:], np.s_[:, :-1]),
+        Direction.EAST: (np.s_[:, :-1], np.s_[:, 1:]),
+        Direction.NORTH: (np.s_[1:, :], np.s_[:-1, :]),
+        Direction.SOUTH: (np.s_[:-1, :], np.s_[1:, :]),
+    }
+    for direction in PARENT_ORDER:
+        target, source = shifts[direction]
+        claimed = current[source] & unvisited[target]
+        unvisited[target] &= ~claimed
+        parents[target][claimed] = direction
+        reached[target] |= claimed
+
+    return np.flatnonzero(reached)
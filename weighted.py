@@ -0,0 +1,60 @@
+#
+# This module contains WeightedContext, the per-query state of an A* search over a GridGraph whose cells have
+# integer traversal costs.
+#
+
+from priorityqueue import BucketQueue
+from searchcontext import SearchContext
+
+def lowest_cost(costs):
+    """ Returns the lowest cost in *costs*, or 1 if it is None. This reads every cost; Maze.lowest_cost
+        keeps the result between searches.
+    """
+    return min(costs) if costs else 1
+
+class WeightedContext(SearchContext):
+    """WeightedContext
+        A search in which entering a cell costs that cell's entry in *costs* instead of 1. As the costs and
+        the heuristic are integers, so are the f values, and the open list is a BucketQueue.
+
+        Parameters
+        __________
+        graph: GridGraph
+            the graph to search
+        from_cell: int
+            the cell id the search starts from
+        heuristic: function
+            returns an integer heuristic value of a cell id, consistent with the costs, see
+            heuristics.integer_heuristic
+        costs: bytes-like
+            the cost of entering each cell id, from 1 to 255, or None for a cost of 1 everywhere
+    """
+    queue_type = BucketQueue
+
+    def __init__(self, graph, from_cell, heuristic, costs):
+        self.costs = costs
+        super().__init__(graph, from_cell, heuristic)
+
+    def relax(self, cell):
+        """ Opens every neighbor of *cell*, or lowers its g if the route through *cell* is cheaper.
+            Returns the neighbors whose g was set.
+        """
+        g, parent, open_nodes, closed_nodes, costs = self.g, self.parent, self.open_nodes, self.closed_nodes, self.costs
+
+        updated = []
+        cell_g = g[cell]
+        for offset in self.graph.mask_offsets[self.graph.neighbor_masks[cell]]:
+            neighbor = cell + offset
+
+            # With a consistent heuristic, closed cells already have their cheapest g
+            if neighbor in closed_nodes: continue
+
+            neighbor_g = cell_g + (1 if costs is None else costs[neighbor])
+            existing_g = g.get(neighbor)
+            if existing_g is None or neighbor_g < existing_g:
+                g[neighbor] = neighbor_g
+                parent[neighbor] = cell
+                open_nodes.insert(neighbor)
+                updated.append(neighbor)
+
+        return updated